@@ -5,6 +5,8 @@ __all__ = [
     "designsweeptypes",
     "exceptions",
     "expressions",
+    "line_tokenizer",
+    "parse_cache",
     "parser",
     "parser_builders",
 ]
@@ -4,7 +4,8 @@ import importlib
 import pyparsing as pp
 from pydoc import locate
 
-from xenon.base.datatypes import XenonObj, Sweepable, UnassignedParamValue
+from xenon.base.datatypes import XenonObj, Sweepable, UnassignedParamValue, \
+    freeze, thaw
 from xenon.base.exceptions import *
 from xenon.base.expressions import Expression
 from xenon.base.keywords import *
@@ -55,6 +56,20 @@ class SelectionCommand(Command):
     """
     return common.getSelectedObjs(self.tokens, env)
 
+  def selectParamHolders(self, env, param):
+    """ Return the selected objects that have param as a sweepable param.
+
+    See common.getSelectedParamHolders() for more details.
+    """
+    return common.getSelectedParamHolders(self.tokens, env, param)
+
+  def selectWithAttr(self, env, attr):
+    """ Return the selected objects that have an attribute attr.
+
+    See common.getSelectedObjsWithAttr() for more details.
+    """
+    return common.getSelectedObjsWithAttr(self.tokens, env, attr)
+
   def execute(self, env):
     return self.select(env)
 
@@ -130,6 +145,11 @@ class SetCommand(Command):
     ones that do not have this parameter. If, after going through all selected
     objects, none have the parameter as an attribute, raise an exception.
 
+    The value is set on every selected object with an attribute of that name,
+    whether it is a sweepable param or a plain attribute like the output_dir
+    of a sweep. These objects are found through the path index of the sweep,
+    without checking the rest of the selection.
+
     Expressions can naturally refer to attributes of other Sweepable objects,
     but there are a few ways they can be written, so we attempt to evaluate
     them in three places.
@@ -150,11 +170,14 @@ class SetCommand(Command):
         # If the selection failed, then don't do anything.
         value = UnassignedParamValue()
 
-    selected_objs = self.selection(sweep_obj)
+    selected_objs = self.selection.selectWithAttr(sweep_obj, self.param)
     is_applied = False
+    # Objects imported by `use` are only copied once they are modified.
+    thaw_memo = {}
     for obj in selected_objs:
       if hasattr(obj, self.param):
         if not isinstance(value, UnassignedParamValue):
+          obj = thaw(sweep_obj, obj, thaw_memo)
           setattr(obj, self.param, value)
         is_applied = True
         # Remove this parameter from obj.sweep_params_range, if it exists, so
@@ -162,6 +185,7 @@ class SetCommand(Command):
         # sweep command after the set command can restore this parameter to
         # sweep_params_range!
         if isinstance(obj, Sweepable) and obj.hasSweepParamRange(self.param):
+          obj = thaw(sweep_obj, obj, thaw_memo)
           obj.removeFromSweepParamRange(self.param)
 
     if not is_applied:
@@ -171,6 +195,48 @@ class SetCommand(Command):
     self.setParam(sweep_obj)
     return sweep_obj
 
+class RequireCommand(Command):
+  def __init__(self, lineno, line, parse_result):
+    """ Construct a require command.
+
+    A require command constrains the sweep to configs for which its expression
+    is true.
+    """
+    super(RequireCommand, self).__init__(lineno, line, parse_result)
+    self.expression = parse_result.expression
+
+  def execute(self, sweep_obj):
+    sweep_obj.addConstraint(self.expression)
+    return sweep_obj
+
+# Maps each module imported with `use module.*` to a dict of frozen copies of
+# its XenonObjs and its types, which are imported into every sweep that uses
+# the module. A sweep only copies one of these objects once it modifies it
+# (see datatypes.thaw()), so importing a module is cheap, and sweeps share the
+# parts of a module that they do not modify.
+use_snapshots_ = {}
+
+def getUseSnapshot_(module):
+  """ Return the frozen copies of the objects of module, copying them on first use. """
+  snapshot = use_snapshots_.get(module.__name__)
+  if snapshot is None:
+    snapshot = {}
+    for attr, val in module.__dict__.items():
+      if isinstance(val, XenonObj) or isinstance(val, type):
+        snapshot[attr] = copy.deepcopy(val)
+        if isinstance(val, XenonObj):
+          freeze(attr, snapshot[attr])
+    use_snapshots_[module.__name__] = snapshot
+  return snapshot
+
+def bindImport_(target_obj, attr, value):
+  """ Bind an imported name to target_obj.
+
+  Imported names are never user attributes of a Sweepable, even if their
+  values are plain values, so they do not appear in generated configs.
+  """
+  XenonObj.__setattr__(target_obj, attr, value)
+
 class UseCommand(Command):
   def __init__(self, lineno, line, parse_result):
     super(UseCommand, self).__init__(lineno, line, parse_result)
@@ -194,19 +260,19 @@ class UseCommand(Command):
       raise XenonImportError(self.package_path, e)
 
     if path_terminator == LIT_STAR:
-      # Import everything into the global namespace.
-      for attr, val in parent_package.__dict__.items():
-        if isinstance(val, XenonObj) or isinstance(val, type):
-          target_obj.__dict__[attr] = copy.deepcopy(val)
+      # Import everything into the global namespace. The imported objects are
+      # the module's state when it was first imported like this.
+      for attr, val in getUseSnapshot_(parent_package).items():
+        bindImport_(target_obj, attr, val)
     elif path_terminator != "":
       # Import the specified child item (which might be module itself).
       try:
-        target_obj.__dict__[path_terminator] = getattr(parent_package, path_terminator)
+        bindImport_(target_obj, path_terminator, getattr(parent_package, path_terminator))
       except AttributeError as e:
         raise XenonImportError(self.package_path, e)
     else:
       # There was no child specified for this path.
-      target_obj.__dict__[parent_module_path] = parent_package
+      bindImport_(target_obj, parent_module_path, parent_package)
 
     return sweep_obj
 
@@ -243,11 +309,15 @@ class SweepCommand(Command):
     self.selection = SelectionCommand(lineno, line, parse_result)
 
   def execute(self, sweep_obj):
-    selected_objs = self.selection(sweep_obj)
+    # Only objects that have the param as a sweepable param can sweep it.
+    selected_objs = self.selection.selectParamHolders(sweep_obj, self.sweep_param)
     is_applied_at_least_once = False
+    # Objects imported by `use` are only copied once they are modified.
+    thaw_memo = {}
     for obj in selected_objs:
       if not isinstance(obj, Sweepable):
         continue
+      obj = thaw(sweep_obj, obj, thaw_memo)
       if self.is_explicit_list:
         ret = obj.setSweepParameterList(self.sweep_param, self.list_value)
       else:
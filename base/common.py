@@ -1,4 +1,4 @@
-from xenon.base.datatypes import XenonObj
+from xenon.base.datatypes import XenonObj, Sweepable, getParamHolders
 from xenon.base.keywords import LIT_STAR
 import xenon.base.exceptions as xe
 
@@ -27,6 +27,13 @@ def getSelectedObjs(select_tokens, env):
   if len(select_tokens) == 0:
     select_tokens.append(LIT_STAR)
 
+  # Sweeps index the objects under them.
+  path_index = getattr(env, "path_index_", None)
+  if path_index is not None:
+    selected_objs = path_index.select(select_tokens[0])
+    if selected_objs is not None:
+      return selected_objs
+
   current_view = env
   for token in select_tokens[0]:
     if token == LIT_STAR:
@@ -47,6 +54,40 @@ def getSelectedObjs(select_tokens, env):
   selected_objs.extend([current_view])
   return selected_objs
 
+def getSelectedParamHolders(select_tokens, env, param):
+  """ Return the objects selected from env that have the sweepable param.
+
+  This returns the same objects, in the same order, as filtering the result
+  of getSelectedObjs by getParamHolders(param), but selections answered by
+  the PathIndex of a sweep only look at the objects that have the param.
+  """
+  holders = getParamHolders(param)
+  if len(select_tokens) == 0:
+    select_tokens.append(LIT_STAR)
+  path_index = getattr(env, "path_index_", None)
+  if path_index is not None:
+    selected_objs = path_index.select(select_tokens[0], holders)
+    if selected_objs is not None:
+      return selected_objs
+  return [obj for obj in getSelectedObjs(select_tokens, env)
+          if isinstance(obj, Sweepable) and obj in holders]
+
+def getSelectedObjsWithAttr(select_tokens, env, attr):
+  """ Return the objects selected from env that have an attribute attr.
+
+  This returns the same objects, in the same order, as filtering the result
+  of getSelectedObjs by hasattr(), but selections answered by the PathIndex of
+  a sweep do not check every selected object on each call.
+  """
+  if len(select_tokens) == 0:
+    select_tokens.append(LIT_STAR)
+  path_index = getattr(env, "path_index_", None)
+  if path_index is not None:
+    selected_objs = path_index.select(select_tokens[0], attr=attr)
+    if selected_objs is not None:
+      return selected_objs
+  return [obj for obj in getSelectedObjs(select_tokens, env) if hasattr(obj, attr)]
+
 def getSelectedAttrOnView(select_tokens, view):
   """ Return the selected attribute over a SweepableView.
 
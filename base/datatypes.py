@@ -1,19 +1,237 @@
+import bisect
+import collections
+import copy
 import itertools
 import math
 import pprint
+import types
+import weakref
 
 from xenon.base.keywords import *
 import xenon.base.exceptions as xe
 
+# Incremented whenever a XenonObj is attached to or detached from an attribute
+# of another XenonObj, so that PathIndex objects know when to rebuild.
+tree_version_ = 0
+
+def invalidatePathIndices():
+  """ Mark every PathIndex as out of date.
+
+  Attribute assignments on XenonObjs do this automatically. Code that writes
+  to the __dict__ of a XenonObj directly must call this itself.
+  """
+  global tree_version_
+  tree_version_ += 1
+
+# Maps each attribute name to a counter that is incremented whenever a
+# XenonObj gains or loses an attribute of that name, so that PathIndex objects
+# know when to recompute which of their objects have that attribute.
+attr_versions_ = collections.defaultdict(int)
+
+# The default of getattr() for attributes that an object does not have.
+MISSING_ATTR_ = object()
+
+def noteSetAttr_(obj, attr, value):
+  """ Invalidate the indices that setting obj.attr to value makes out of date. """
+  old_value = getattr(obj, attr, MISSING_ATTR_)
+  if isIndexedValue_(value) or isIndexedValue_(old_value):
+    invalidatePathIndices()
+  if old_value is MISSING_ATTR_:
+    attr_versions_[attr] += 1
+
+# Maps each param name and id to the set of ParamTables that have that param.
+# Each ParamTable in turn tracks the Sweepables that use it, which makes this
+# the inverse of the sweepable_params_dict_ of every Sweepable, so commands
+# can find the objects with a param without checking every selected object.
+param_tables_ = collections.defaultdict(weakref.WeakSet)
+
+class ParamHolders(object):
+  """ The set of Sweepables that have a param, as returned by getParamHolders().
+
+  This supports len(), iteration and membership tests like a set, and
+  reflects the Sweepables that use the param's ParamTables when it was made.
+  """
+  def __init__(self, tables):
+    self.tables = tables
+
+  def __len__(self):
+    return sum(len(table.holders_) for table in self.tables)
+
+  def __iter__(self):
+    for table in self.tables:
+      for obj in list(table.holders_):
+        yield obj
+
+  def __contains__(self, obj):
+    table = getattr(obj, "param_table_", None)
+    return table in self.tables and obj in table.holders_
+
+def getParamHolders(name_or_id):
+  """ Return the set of Sweepables that have the param with this name or id. """
+  if name_or_id in param_tables_:
+    return ParamHolders(set(param_tables_[name_or_id]))
+  return ParamHolders(set())
+
+# Maps the id of each frozen XenonObj to the name and value of the top-level
+# attribute that it was frozen under (see freeze()).
+frozen_owners_ = {}
+
+def checkNotFrozen_(obj):
+  if id(obj) in frozen_owners_:
+    raise xe.XenonFrozenObjectError(obj)
+
+def isIndexedValue_(value):
+  """ Returns true if value is a XenonObj that a PathIndex would index. """
+  return isinstance(value, XenonObj) and not isinstance(value, UnassignedParamValue)
+
+# Maps each XenonObj subclass to the set of names of its class attributes
+# (including inherited ones) whose values are XenonObjs. Computed once per
+# class, on first use.
+class_xenonobj_attrs_ = {}
+
+def getClassXenonObjAttrs_(cls):
+  attrs = class_xenonobj_attrs_.get(cls)
+  if attrs is None:
+    attrs = frozenset(attr for attr in dir(cls)
+                      if isinstance(getattr(cls, attr, None), XenonObj))
+    class_xenonobj_attrs_[cls] = attrs
+  return attrs
+
+# Interned user_attrs sets. Most Sweepables of a class have the same user
+# attributes, so they share a single frozenset.
+user_attrs_sets_ = {}
+
+def internUserAttrs_(attrs):
+  return user_attrs_sets_.setdefault(attrs, attrs)
+
+class ParamTable(object):
+  """ The sweepable params of a Sweepable, with a mapping to/from their names and ids.
+
+  ParamTables are immutable and shared. Every Sweepable of a class starts with
+  the table of its class's sweepable_params, and removing a param switches an
+  object to another shared table without that param. Each table has a set of
+  the Sweepables that use it, for getParamHolders().
+  """
+  def __init__(self, params):
+    self.params = tuple(params)
+    self.ids = {}
+    for param in self.params:
+      self.ids[param.name] = param.id
+      self.ids[param.id] = param.name
+      param_tables_[param.name].add(self)
+      param_tables_[param.id].add(self)
+    self.holders_ = weakref.WeakSet()
+    self.without_ = {}
+    self.including_ = {}
+
+  def without(self, param):
+    """ Return the table of these params without param.
+
+    Raises:
+      ValueError: if param is not one of these params.
+    """
+    table = self.without_.get(param.id)
+    if table is None:
+      params = list(self.params)
+      params.remove(param)
+      table = ParamTable(params)
+      self.without_[param.id] = table
+    return table
+
+  def including(self, param):
+    """ Return the table of these params and param, which is added last. """
+    if param in self.params:
+      return self
+    table = self.including_.get(param.id)
+    if table is None:
+      table = ParamTable(self.params + (param,))
+      self.including_[param.id] = table
+    return table
+
+  def __deepcopy__(self, memo):
+    return self
+
+  def __getstate__(self):
+    return {"params": self.params}
+
+  def __setstate__(self, state):
+    self.__init__(state["params"])
+
+# Maps each Sweepable subclass to the ParamTable of its sweepable_params.
+class_param_tables_ = {}
+
+def getClassParamTable_(cls):
+  table = class_param_tables_.get(cls)
+  if table is None:
+    table = ParamTable(cls.sweepable_params)
+    class_param_tables_[cls] = table
+  return table
+
 class XenonObj(object):
-  """ Base class for any object defined by the Xenon system. """
+  """ Base class for any object defined by the Xenon system.
+
+  Each XenonObj keeps a registry of its attributes whose values are XenonObjs,
+  so that iterating over those (like the children of a Sweepable) does not
+  have to check every attribute from dir(). The registry is updated when
+  attributes are set or deleted, so attributes must not be assigned through
+  __dict__ directly. Class attributes are registered once per class, and
+  must not be reassigned to or from XenonObjs afterwards.
+
+  XenonObj methods avoid touching the instance __dict__, which lets CPython
+  keep the attribute values of an object in a compact array that shares its
+  keys with the other objects of the class.
+  """
+
+  # The instance registry of XenonObj attributes. Created on first use.
+  xenonobj_attrs_ = None
 
   def __init__(self):
     pass
 
+  def __setattr__(self, attr, value):
+    checkNotFrozen_(self)
+    noteSetAttr_(self, attr, value)
+    super(XenonObj, self).__setattr__(attr, value)
+    self.registerAttr_(attr, value)
+
+  def __delattr__(self, attr):
+    checkNotFrozen_(self)
+    if isIndexedValue_(getattr(self, attr, None)):
+      invalidatePathIndices()
+    super(XenonObj, self).__delattr__(attr)
+    self.registerAttr_(attr, None)
+    if not hasattr(self, attr):
+      attr_versions_[attr] += 1
+
+  def getXenonObjAttrs_(self):
+    """ Return the names of all attributes that may hold a XenonObj. """
+    attrs = getClassXenonObjAttrs_(type(self))
+    if self.xenonobj_attrs_:
+      attrs = attrs.union(self.xenonobj_attrs_)
+    return attrs
+
+  def registerAttr_(self, attr, value):
+    """ Record whether attribute attr now holds a XenonObj. """
+    xenonobj_attrs = self.xenonobj_attrs_
+    if isinstance(value, XenonObj):
+      if xenonobj_attrs is None:
+        xenonobj_attrs = set()
+        object.__setattr__(self, "xenonobj_attrs_", xenonobj_attrs)
+      xenonobj_attrs.add(attr)
+    elif xenonobj_attrs is not None:
+      xenonobj_attrs.discard(attr)
+
   def iterattrkeys(self, objtype=object):
-    """ Analogue of dict.iterkeys() over attributes, with filtering. """
-    for attr in dir(self):
+    """ Analogue of dict.iterkeys() over attributes, with filtering.
+
+    Attributes are returned in sorted order, like dir(). If objtype is a
+    XenonObj type, only the registered XenonObj attributes are checked.
+    """
+    if isinstance(objtype, type) and issubclass(objtype, XenonObj):
+      attrs = sorted(self.getXenonObjAttrs_())
+    else:
+      attrs = dir(self)
+    for attr in attrs:
       if self.filter_func_(attr, objtype):
         yield attr
 
@@ -142,12 +360,20 @@ class UnassignedParamValue(XenonObj):
   def __init__(self):
     super(UnassignedParamValue, self).__init__()
 
+  def __deepcopy__(self, memo):
+    # UnassignedParamValues have no state, so copies can share them.
+    return self
+
   def __float__(self):
     raise xe.XenonTypeError("UnassignedParamValue cannot be converted to float.")
 
   def __int__(self):
     raise xe.XenonTypeError("UnassignedParamValue cannot be converted to int.")
 
+# The value of every param that has not been set. It is not a class attribute
+# of Sweepable, so that it is not one of the XenonObj attributes of Sweepables.
+unassigned_param_value_ = UnassignedParamValue()
+
 class Sweepable(XenonObj):
   """ Base class for any object with parameters that can be swept.
 
@@ -165,14 +391,32 @@ class Sweepable(XenonObj):
   1. Explain when parameters should be initialized to None.
   2. Explain how attributes are handled.
   3. Distiguish sweepable_params from sweep_params_range_.
+
+  Data models can have hundreds of thousands of Sweepables, so the state that
+  is usually the same for every object of a class is shared: the
+  sweepable_params_ and their name/id mapping (see ParamTable), the
+  user_attrs set, and the UnassignedParamValue of parameters that have not
+  been set. For this reason, sweepable_params_ is a tuple and user_attrs is a
+  frozenset, which cannot be modified in place. Use addSweepableParam(),
+  removeSweepableParam(), addUserAttr() and removeUserAttr() instead, which
+  replace them for this object only.
   """
 
   # A list of sweepable parameters for this class.
-  # When a Sweepable object is constructed, this list is copied into the
-  # constructed instance. All future references should use that list.
-  # Per-instance lists can be modified, but this list cannot.
+  # When a Sweepable object is constructed, it shares a ParamTable of these
+  # params with the other objects of its class. All future references should
+  # use sweepable_params_. Params can be added to or removed from individual
+  # objects with addSweepableParam() and removeSweepableParam(), but this list
+  # cannot be modified.
   sweepable_params = []
 
+  # The command `sweep param from x to y linstep z` will check if `param` is
+  # an entry of sweepable_params for this class. If so, it add an entry to
+  # this dict, mapping the parameter id to the specified range (which is
+  # immediately expanded into a Python list). Objects share this empty
+  # mapping until a range is first set on them.
+  sweep_params_range_ = types.MappingProxyType({})
+
   builtins_ = [
       int, float, str, dict, list, None, bool, complex, tuple,
       UnassignedParamValue
@@ -181,49 +425,99 @@ class Sweepable(XenonObj):
   def __init__(self, name):
     # We must add the user_attrs attribute before calling the super
     # constructor, since the super constructor will also eventually call
-    # __setattr__, which expects the presence of user_attrs.
-    self.user_attrs = set()
+    # __setattr__, which expects the presence of user_attrs. It is an interned
+    # frozenset, which is replaced whenever an attribute is added.
+    self.user_attrs = internUserAttrs_(frozenset())
+    # The sweepable params of this object. Initially the class's
+    # sweepable_params, which the table is shared with.
+    self.param_table_ = getClassParamTable_(self.__class__)
     super(Sweepable, self).__init__()
     self.name = name
 
-    self.sweepable_params_ = [p for p in self.__class__.sweepable_params]
-
-    # Automatically generated mapping to/from Param name and id.
-    # TODO: Does this actually provide any significant benefit compared to
-    # iterating over sweepable_params list?
-    self.sweepable_params_dict_ = {}
-
-    # The command `sweep param from x to y linstep z` will check if `param` is
-    # an entry of sweepable_params for this class. If so, it add an entry to
-    # this dict, mapping the parameter id to the specified range (which is
-    # immediately expanded into a Python list).
-    self.sweep_params_range_ = {}
     self.createSweepAttributes()
 
   def __setattr__(self, attr, value):
-    self.__dict__[attr] = value
+    checkNotFrozen_(self)
+    noteSetAttr_(self, attr, value)
+    object.__setattr__(self, attr, value)
+    self.registerAttr_(attr, value)
     if (type(value) in Sweepable.builtins_ and
         not attr.startswith("_") and
         not attr.endswith("_") and
-        not attr == "user_attrs"):
-      self.user_attrs.add(attr)
+        not attr == "user_attrs" and
+        attr not in self.user_attrs):
+      object.__setattr__(self, "user_attrs", internUserAttrs_(self.user_attrs | {attr}))
+
+  @property
+  def sweepable_params_(self):
+    """ A tuple of the Params of this object. """
+    return self.param_table_.params
+
+  @property
+  def sweepable_params_dict_(self):
+    """ Maps the names of the Params of this object to their ids, and vice versa. """
+    return self.param_table_.ids
+
+  def registerAttr_(self, attr, value):
+    # Params are always checked by iterattrkeys(), so the registry does not
+    # need to record the params that are unassigned, which is most of them.
+    if isinstance(value, UnassignedParamValue) and attr in self.param_table_.ids:
+      value = None
+    super(Sweepable, self).registerAttr_(attr, value)
+
+  def getXenonObjAttrs_(self):
+    attrs = super(Sweepable, self).getXenonObjAttrs_()
+    return attrs.union(param.name for param in self.param_table_.params)
 
   def createSweepAttributes(self):
     """ Create an attribute for each parameter in sweepable_params. """
+    self.param_table_.holders_.add(self)
     for param in self.sweepable_params_:
       # Setting the value to UnassignedParamValue by default (instead of
       # param.default) makes it possible to distinguish values that should be
       # inherited from this object's parents from values that were specifically
       # set on this object by the user.
-      setattr(self, param.name, UnassignedParamValue())
-      self.sweepable_params_dict_[param.name] = param.id
-      self.sweepable_params_dict_[param.id] = param.name
+      setattr(self, param.name, unassigned_param_value_)
+
+  def addSweepableParam(self, param):
+    """ Add the specified Param object to sweepable_params_.
+
+    If this object has no attribute for the param yet, it is created with an
+    unassigned value.
+    """
+    self.param_table_.holders_.discard(self)
+    self.param_table_ = self.param_table_.including(param)
+    self.param_table_.holders_.add(self)
+    if not hasattr(self, param.name):
+      setattr(self, param.name, unassigned_param_value_)
+    # The attribute is now checked as a param.
+    self.registerAttr_(param.name, getattr(self, param.name))
 
   def removeSweepableParam(self, param):
     """ Remove the specified Param object from sweepable_params_. """
-    self.sweepable_params_.remove(param)
-    del self.sweepable_params_dict_[param.id]
-    del self.sweepable_params_dict_[param.name]
+    self.param_table_.holders_.discard(self)
+    self.param_table_ = self.param_table_.without(param)
+    self.param_table_.holders_.add(self)
+    # The attribute is no longer checked as a param.
+    self.registerAttr_(param.name, getattr(self, param.name, None))
+
+  def __setstate__(self, state):
+    # Copies and unpickled objects are not constructed through __init__, so
+    # they must be added to the holders of their ParamTable here.
+    # Setting each attribute, rather than updating __dict__, keeps the copy as
+    # compact as the original.
+    for attr, value in state.items():
+      object.__setattr__(self, attr, value)
+    object.__setattr__(self, "user_attrs", internUserAttrs_(self.user_attrs))
+    self.param_table_.holders_.add(self)
+
+  def addUserAttr(self, attr):
+    """ Add attr to the user_attrs of this object. """
+    self.user_attrs = internUserAttrs_(self.user_attrs | {attr})
+
+  def removeUserAttr(self, attr):
+    """ Remove attr from the user_attrs of this object, if it is there. """
+    self.user_attrs = internUserAttrs_(self.user_attrs - {attr})
 
   def getParamDefaultValue(self, name):
     for param in self.sweepable_params_:
@@ -239,6 +533,13 @@ class Sweepable(XenonObj):
   def getParamName(self, param_id):
     return self.sweepable_params_dict_[param_id]
 
+  def getOwnSweepParamsRange_(self):
+    """ Return sweep_params_range_, first replacing the shared empty mapping. """
+    checkNotFrozen_(self)
+    if type(self.sweep_params_range_) is not dict:
+      self.sweep_params_range_ = {}
+    return self.sweep_params_range_
+
   def hasSweepParamRange(self, name):
     param_id = self.getParamId(name)
     return param_id in self.sweep_params_range_
@@ -252,7 +553,7 @@ class Sweepable(XenonObj):
 
   def removeFromSweepParamRange(self, name):
     param_id = self.getParamId(name)
-    del self.sweep_params_range_[param_id]
+    self.getOwnSweepParamsRange_().pop(param_id)
 
   def iterparamids(self):
     """ Returns a generator over ids of swept parameters. """
@@ -290,7 +591,7 @@ class Sweepable(XenonObj):
     elif step_type == "expstep":
       value_range = [start * (step ** exp)
                      for exp in range(0, int(math.log(end/start, step))+1)]
-    self.sweep_params_range_[param_id] = value_range
+    self.getOwnSweepParamsRange_()[param_id] = value_range
     return xe.SUCCESS
 
   def setSweepParameterList(self, name, list_value):
@@ -304,7 +605,7 @@ class Sweepable(XenonObj):
     param_id = self.getParamId(name)
     if param_id == None:
       return xe.INVALID_SWEEP_PARAMETER
-    self.sweep_params_range_[param_id] = list_value
+    self.getOwnSweepParamsRange_()[param_id] = list_value
     return xe.SUCCESS
 
   def getSweepableParamsAndValues(self):
@@ -354,9 +655,184 @@ class Sweepable(XenonObj):
   def __repr__(self):
     return "{0}(name=\"{1}\")".format(self.__class__.__name__, self.name)
 
+class PathIndex(object):
+  """ An index of the XenonObjs reachable from a root object by attribute paths.
+
+  Selections like "for a.b" and "for a.*" look up their objects here instead
+  of walking the object tree with dir() on every command (see
+  common.getSelectedObjs). The index is built on first use, and rebuilt on the
+  first use after any XenonObj attribute changes.
+
+  Objects are stored in the order in which common.recursiveSelect visits them,
+  so a "prefix.*" selection is a slice of that order. UnassignedParamValues are
+  not indexed, since no command can apply to them.
+  """
+  def __init__(self, root):
+    self.root = root
+    self.version_ = None
+    # Every object, in preorder from the root. An object reachable through
+    # several paths appears once per path.
+    self.preorder_ = []
+    # Maps each path (a tuple of attribute names) to a (start, end) tuple,
+    # where preorder_[start] is the object at that path and
+    # preorder_[start + 1:end] are the objects under it.
+    self.paths_ = {}
+    # Maps the id of each object to its positions in preorder_.
+    self.positions_ = {}
+    # Maps attribute names to (version, positions) tuples, where positions is
+    # the sorted list of the positions in preorder_ of the objects that had
+    # that attribute when attr_versions_ of the name was version.
+    self.attr_positions_ = {}
+
+  def update_(self):
+    if self.version_ == tree_version_:
+      return
+    self.preorder_ = []
+    self.paths_ = {}
+    self.positions_ = collections.defaultdict(list)
+    self.attr_positions_ = {}
+    self.addObject_((), self.root)
+    self.version_ = tree_version_
+
+  def addObject_(self, path, obj):
+    start = len(self.preorder_)
+    self.preorder_.append(obj)
+    self.positions_[id(obj)].append(start)
+    for attr, child in obj.iterattritems(objtype=XenonObj):
+      if child == obj or isinstance(child, UnassignedParamValue):
+        continue
+      self.addObject_(path + (attr,), child)
+    self.paths_[path] = (start, len(self.preorder_))
+
+  def getAttrPositions_(self, attr):
+    """ Return the sorted positions in preorder_ of the objects with attr. """
+    version = attr_versions_.get(attr, 0)
+    cached = self.attr_positions_.get(attr)
+    if cached is None or cached[0] != version:
+      cached = (version, [position for position, obj in enumerate(self.preorder_)
+                          if hasattr(obj, attr)])
+      self.attr_positions_[attr] = cached
+    return cached[1]
+
+  def select(self, tokens, holders=None, attr=None):
+    """ Return the objects selected by a selection path.
+
+    Args:
+      tokens: A list of attribute names, optionally ending with LIT_STAR to
+        select everything under that path.
+      holders: If not None, a set of Sweepables (see getParamHolders()). Only
+        the selected objects in this set are returned, in the same order. This
+        takes time proportional to the smaller of the selection and the set.
+      attr: If not None, only the selected objects that have an attribute with
+        this name are returned, in the same order. The objects with each
+        attribute are found once and remembered until an object gains or
+        loses that attribute.
+
+    Returns:
+      The same list as common.getSelectedObjs, or None if the path does not
+      lead to an indexed object.
+    """
+    self.update_()
+    tokens = list(tokens)
+    is_recursive = len(tokens) > 0 and tokens[-1] == LIT_STAR
+    if is_recursive:
+      tokens.pop()
+    bounds = self.paths_.get(tuple(tokens))
+    if bounds is None:
+      return None
+    start, end = bounds
+    if not is_recursive:
+      end = start + 1
+    if attr is not None:
+      positions = self.getAttrPositions_(attr)
+      selected_objs = [self.preorder_[position] for position in positions[
+          bisect.bisect_right(positions, start):bisect.bisect_left(positions, end)]]
+      root = self.preorder_[start]
+      if hasattr(root, attr):
+        selected_objs.append(root)
+      return selected_objs
+    if holders is None:
+      return self.preorder_[start + 1:end] + [self.preorder_[start]]
+    if len(holders) < end - start:
+      positions = sorted(position for holder in holders
+                         for position in self.positions_.get(id(holder), [])
+                         if start < position < end)
+      selected_objs = [self.preorder_[position] for position in positions]
+    else:
+      selected_objs = [obj for obj in self.preorder_[start + 1:end]
+                       if isinstance(obj, Sweepable) and obj in holders]
+    root = self.preorder_[start]
+    if isinstance(root, Sweepable) and root in holders:
+      selected_objs.append(root)
+    return selected_objs
+
+  def __getstate__(self):
+    # The index is rebuilt on demand, so copies only keep the root.
+    return {"root": self.root}
+
+  def __setstate__(self, state):
+    self.__init__(state["root"])
+
+def freeze(name, root):
+  """ Freeze root and every XenonObj reachable from it.
+
+  Frozen objects can be shared by several sweeps, as the value of their
+  attribute name, since they cannot be modified: setting an attribute or a
+  sweep range on one raises XenonFrozenObjectError. A sweep that needs to
+  modify them calls thaw() first.
+  """
+  objs = [root]
+  while objs:
+    obj = objs.pop()
+    if id(obj) in frozen_owners_:
+      continue
+    frozen_owners_[id(obj)] = (name, root)
+    objs.extend(child for child in obj.iterattrvalues(objtype=XenonObj)
+                if isIndexedValue_(child))
+
+def isFrozen(obj):
+  return id(obj) in frozen_owners_
+
+def thaw(env, obj, memo):
+  """ Make obj modifiable in env, if it is frozen.
+
+  The top-level attribute of env that obj was frozen under is replaced with a
+  deep copy, which env then owns. Only objects that are about to be modified
+  should be thawed, so that env keeps sharing the rest.
+
+  Args:
+    env: The object that the frozen object was imported into.
+    obj: The object to thaw.
+    memo: A dict shared by all the calls for one command, so that the objects
+      it selected from the same import are thawed into the same copy.
+
+  Returns:
+    The copy of obj, or obj itself if it was not frozen.
+  """
+  if id(obj) in frozen_owners_:
+    name, root = frozen_owners_[id(obj)]
+    if id(root) not in memo and getattr(env, name, None) is root:
+      setattr(env, name, copy.deepcopy(root, memo))
+  return memo.get(id(obj), obj)
+
 class BaseDesignSweep(Sweepable):
   sweepable_params = []
 
+  # How generated output is compressed while it is written: None, "gzip",
+  # "bz2" or "lzma", and the compression level, or None for the default
+  # level. These are class attributes so that set commands can assign them,
+  # but they only appear in the generated output if they are set.
+  output_compression = None
+  output_compression_level = None
+  # If set, each config is written to its own file instead, in a directory
+  # tree laid out as "hive" (one directory level per swept parameter, like
+  # cycle_time=5/unrolling=4/config.json) or "buckets" (numbered directories
+  # of output_bucket_size configs each, or a default size if None).
+  output_layout = None
+  output_bucket_size = None
+  # If True, configs_sqlite also indexes the column of each swept attribute.
+  output_sqlite_indexes = False
+
   def __init__(self, name=None):
     super(BaseDesignSweep, self).__init__(name)
     self.generate_outputs = set()
@@ -365,6 +841,17 @@ class BaseDesignSweep(Sweepable):
     # Global settings about this sweep.
     self.output_dir = ""
 
+    # Options for the generate_* functions that are not part of the sweep
+    # specification itself, like which shard of the sweep to generate. These
+    # usually come from the command line.
+    self.generator_options_ = {}
+
+    # Expressions that every generated config must satisfy.
+    self.constraints_ = []
+
+    # Answers selections on this sweep.
+    self.path_index_ = PathIndex(self)
+
   def validate(self):
     """ Raise an exception if this sweep has invalid attributes.
 
@@ -396,6 +883,15 @@ class BaseDesignSweep(Sweepable):
     self.checkInitializedAndRaise_()
     self.generate_outputs.add(output)
 
+  def addConstraint(self, expression):
+    """ Only generate configs for which expression evaluates to true. """
+    self.checkInitializedAndRaise_()
+    self.constraints_.append(expression)
+
+  def setGeneratorOptions(self, **options):
+    """ Set options that are passed to the generators of this sweep. """
+    self.generator_options_.update(options)
+
   def checkInitializedAndRaise_(self):
     if self.name == None:
       raise xe.SweepNotInitializedError()
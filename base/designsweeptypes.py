@@ -11,5 +11,22 @@ class ExhaustiveSweep(BaseDesignSweep):
     super(ExhaustiveSweep, self).__init__(name)
 
   def generate_configs(self):
-    generator = exhaustive_configs.ConfigGenerator(self)
+    generator = exhaustive_configs.ConfigGenerator(self, **self.generator_options_)
+    return generator.run()
+
+  def generate_configs_jsonl(self):
+    """ Like generate_configs, but write one compact JSON object per line. """
+    generator = exhaustive_configs.ConfigGenerator(
+        self, output_format=exhaustive_configs.FORMAT_JSONL, **self.generator_options_)
+    return generator.run()
+
+  def generate_configs_sqlite(self):
+    """ Write the configs to an SQLite database with a row per config. """
+    generator = exhaustive_configs.ConfigGenerator(self, **self.generator_options_)
+    return generator.runSqlite()
+
+  def generate_configs_csv(self):
+    """ Like generate_configs, but write a schema once and a CSV row per config. """
+    generator = exhaustive_configs.ConfigGenerator(
+        self, output_format=exhaustive_configs.FORMAT_CSV, **self.generator_options_)
     return generator.run()
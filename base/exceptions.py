@@ -55,3 +55,23 @@ class DuplicateSweepNameError(XenonError):
   def __init__(self, sweep_name):
     super(DuplicateSweepNameError, self).__init__(
         "%s was already declared as the name of another sweep." % sweep_name)
+
+class XenonFrozenObjectError(XenonError):
+  def __init__(self, obj):
+    super(XenonFrozenObjectError, self).__init__(
+        "%s is shared by every sweep that uses its module and cannot be "
+        "modified directly." % repr(obj))
+
+class XenonConfigIndexError(XenonError):
+  def __init__(self, msg):
+    super(XenonConfigIndexError, self).__init__(msg)
+
+# These are also IndexErrors and ValueErrors respectively, which is what
+# ConfigGenerator raised for them before they had their own types.
+class XenonConfigIndexRangeError(XenonConfigIndexError, IndexError):
+  def __init__(self, msg):
+    super(XenonConfigIndexRangeError, self).__init__(msg)
+
+class XenonExcludedConfigError(XenonConfigIndexError, ValueError):
+  def __init__(self, msg):
+    super(XenonExcludedConfigError, self).__init__(msg)
@@ -7,19 +7,94 @@
 
 import abc
 import numpy as np
+import operator
 from pyparsing import Word, nums, alphas, alphanums, Combine, oneOf, \
-    opAssoc, infixNotation, ParseException, delimitedList, MatchFirst
+    ParseException, delimitedList, MatchFirst, Forward, Group, Suppress, ZeroOrMore
 from xenon.base.datatypes import XenonObj
 from xenon.base.common import getSelectedAttrOnView
+from xenon.base.exceptions import XenonTypeError
 
 class Expression(object):
-  """ Base class for all evaluatable expressions. """
+  """ Base class for all evaluatable expressions.
+
+  Expressions can be evaluated directly by walking the expression tree with
+  eval(), or compiled once with compile() into a single Python function that
+  is much cheaper to call repeatedly.
+  """
   __metaclass__ = abc.ABCMeta
 
   @abc.abstractmethod
   def eval(self, env):
     pass
 
+  @abc.abstractmethod
+  def compile_(self, resolver, batch):
+    """ Compile this subexpression into a function of env or a FoldedConstant. """
+    pass
+
+  def compile(self, resolver=None, batch=False):
+    """ Compile this expression into a single Python function of env.
+
+    Constant subexpressions are folded at compile time.
+
+    Args:
+      resolver: An optional function that takes a selection (a list of
+        identifiers) and returns either a function of env that returns the
+        selected attribute, or a FoldedConstant if the attribute is known at
+        compile time. By default, selections are resolved on every call with
+        getSelectedAttrOnView, just like eval() does.
+      batch: If True, the function evaluates the expression for a batch of
+        configs at once: selections may return 1-D NumPy arrays with one
+        element per config, and the result is computed with vectorized
+        operations.
+
+    Returns:
+      A function that takes env and returns the value of the expression.
+    """
+    if resolver is None:
+      resolver = lambda selection: (
+          lambda env: getSelectedAttrOnView(selection, env))
+    return toFunction(self.compile_(resolver, batch))
+
+class FoldedConstant(object):
+    "A compiled subexpression whose value is known at compile time"
+    def __init__(self, value):
+        self.value = value
+
+def toFunction(compiled):
+    "Return a function of env for a compiled subexpression"
+    if isinstance(compiled, FoldedConstant):
+        value = compiled.value
+        return lambda env: value
+    return compiled
+
+def foldConstants(compiled, operands):
+    "Fold compiled into a constant if all of its operands are constants"
+    if all(isinstance(operand, FoldedConstant) for operand in operands):
+        try:
+            return FoldedConstant(compiled(None))
+        except Exception:
+            # Leave errors like division by zero to evaluation time.
+            pass
+    return compiled
+
+def toOperand(obj):
+    "Convert a selected attribute into an operand"
+    if isinstance(obj, list):
+        return np.array(obj)
+    else:
+        return float(obj)
+
+def toBatchOperand(obj):
+    "Convert a selected attribute into an operand for a batch of configs"
+    if isinstance(obj, np.ndarray):
+        return obj.astype(float)
+    elif isinstance(obj, list):
+        # A list would be ambiguous with the batch dimension.
+        raise XenonTypeError("List attributes cannot be evaluated in a batch.")
+    else:
+        return float(obj)
+
 class EvalConstant(Expression):
     "Class to evaluate a parsed constant or variable"
     vars_ = {}
@@ -34,11 +109,18 @@ class EvalConstant(Expression):
         if self.is_constant:
             return float(self.value)
         # Otherwise, this is a selection.
-        obj = getSelectedAttrOnView(self.value, env)
-        if isinstance(obj, list):
-            return np.array(obj)
-        else:
-            return float(obj)
+        return toOperand(getSelectedAttrOnView(self.value, env))
+    def compile_(self, resolver, batch):
+        if self.is_constant:
+            return FoldedConstant(float(self.value))
+        convert = toBatchOperand if batch else toOperand
+        selected = resolver(list(self.value))
+        if isinstance(selected, FoldedConstant):
+            try:
+                return FoldedConstant(convert(selected.value))
+            except Exception:
+                selected = toFunction(selected)
+        return lambda env: convert(selected(env))
 
 class EvalSignOp(Expression):
     "Class to evaluate expressions with a leading + or - sign"
@@ -47,6 +129,11 @@ class EvalSignOp(Expression):
     def eval(self, env):
         mult = {'+':1, '-':-1}[self.sign]
         return mult * self.value.eval(env)
+    def compile_(self, resolver, batch):
+        mult = {'+':1, '-':-1}[self.sign]
+        operand = self.value.compile_(resolver, batch)
+        operand_fn = toFunction(operand)
+        return foldConstants(lambda env: mult * operand_fn(env), [operand])
 
 def operatorOperands(tokenlist):
     "generator to extract operators and operands in pairs"
@@ -57,8 +144,24 @@ def operatorOperands(tokenlist):
         except StopIteration:
             break
 
+def compileBinaryOps(tokenlist, opMap, resolver, batch):
+    "Compile a left-associative chain of binary operators"
+    compiled = tokenlist[0].compile_(resolver, batch)
+    for op,val in operatorOperands(tokenlist[1:]):
+        right = val.compile_(resolver, batch)
+        fn, left_fn, right_fn = opMap[op], toFunction(compiled), toFunction(right)
+        compiled = foldConstants(
+            lambda env, fn=fn, left_fn=left_fn, right_fn=right_fn:
+                fn(left_fn(env), right_fn(env)),
+            [compiled, right])
+    return compiled
+
 class EvalMultOp(Expression):
     "Class to evaluate multiplication and division expressions"
+    opMap = {
+        "*" : operator.mul,
+        "/" : operator.truediv,
+        }
     def __init__(self, tokens):
         self.value = tokens[0]
     def eval(self, env):
@@ -69,9 +172,15 @@ class EvalMultOp(Expression):
             elif op == '/':
                 prod = prod / val.eval(env)
         return prod
+    def compile_(self, resolver, batch):
+        return compileBinaryOps(self.value, EvalMultOp.opMap, resolver, batch)
 
 class EvalAddOp(Expression):
     "Class to evaluate addition and subtraction expressions"
+    opMap = {
+        "+" : operator.add,
+        "-" : operator.sub,
+        }
     def __init__(self, tokens):
         self.value = tokens[0]
     def eval(self, env):
@@ -82,6 +191,8 @@ class EvalAddOp(Expression):
             elif op == '-':
                 sum_value = sum_value -  val.eval(env)
         return sum_value
+    def compile_(self, resolver, batch):
+        return compileBinaryOps(self.value, EvalAddOp.opMap, resolver, batch)
 
 class EvalComparisonOp(Expression):
     "Class to evaluate comparison expressions"
@@ -93,6 +204,14 @@ class EvalComparisonOp(Expression):
         "!=" : lambda a,b : a != b,
         "==" : lambda a,b : a == b,
         }
+    # Alternative spellings that comparisonop also accepts.
+    opMap["<>"] = opMap["!="]
+    opMap["LT"] = opMap["<"]
+    opMap["LE"] = opMap["<="]
+    opMap["GT"] = opMap[">"]
+    opMap["GE"] = opMap[">="]
+    opMap["EQ"] = opMap["=="]
+    opMap["NE"] = opMap["!="]
     def __init__(self, tokens):
         self.value = tokens[0]
     def eval(self, env):
@@ -106,6 +225,37 @@ class EvalComparisonOp(Expression):
         else:
             return True
         return False
+    def compile_(self, resolver, batch):
+        operands = [self.value[0].compile_(resolver, batch)]
+        fns = []
+        for op,val in operatorOperands(self.value[1:]):
+            fns.append(EvalComparisonOp.opMap[op])
+            operands.append(val.compile_(resolver, batch))
+        operand_fns = [toFunction(operand) for operand in operands]
+        if batch:
+            # Chained comparisons cannot short circuit over a batch, so the
+            # results of each comparison are combined elementwise.
+            def compiled(env):
+                val1 = operand_fns[0](env)
+                result = True
+                for fn, operand_fn in zip(fns, operand_fns[1:]):
+                    val2 = operand_fn(env)
+                    result = np.logical_and(result, fn(val1, val2))
+                    val1 = val2
+                return result
+        elif len(fns) == 1:
+            fn, left_fn, right_fn = fns[0], operand_fns[0], operand_fns[1]
+            compiled = lambda env: bool(fn(left_fn(env), right_fn(env)))
+        else:
+            def compiled(env):
+                val1 = operand_fns[0](env)
+                for fn, operand_fn in zip(fns, operand_fns[1:]):
+                    val2 = operand_fn(env)
+                    if not fn(val1, val2):
+                        return False
+                    val1 = val2
+                return True
+        return foldConstants(compiled, operands)
 
 
 # define the parser
@@ -120,19 +270,59 @@ signop = oneOf('+ -')
 multop = oneOf('* /')
 plusop = oneOf('+ -')
 
+def buildUnaryOperatorLevel(operand, op, EvalClass):
+  """ A level of right-associative unary operators, like -a. """
+  expr = Forward()
+  expr <<= Group(op + expr).setParseAction(EvalClass) | operand
+  return expr
+
+def buildBinaryOperatorLevel(operand, op, EvalClass):
+  """ A level of left-associative binary operators, like a + b - c.
+
+  A chain of two or more operands becomes a single EvalClass over all of them,
+  and a lone operand is passed through.
+  """
+  def buildChain(tokens):
+    if len(tokens) > 1:
+      return EvalClass([tokens.copy()])
+  return (operand + ZeroOrMore(op + operand)).setParseAction(buildChain)
+
+def buildOperatorGrammar(operand, levels):
+  """ Build a grammar of operators over operand, with optional parentheses.
+
+  This parses the same language into the same trees as pyparsing's
+  infixNotation(), but parses each operand once. infixNotation() looks ahead
+  over the operands of every level before matching it, which makes the time
+  to parse an operand exponential in the number of nested levels.
+
+  Args:
+    operand: The grammar of an operand.
+    levels: A list of (operator, arity, EvalClass) tuples, from the highest
+      precedence to the lowest.
+  """
+  expr = Forward()
+  level = operand | (Suppress("(") + expr + Suppress(")"))
+  for op, arity, EvalClass in levels:
+    if arity == 1:
+      level = buildUnaryOperatorLevel(level, op, EvalClass)
+    else:
+      level = buildBinaryOperatorLevel(level, op, EvalClass)
+  expr <<= level
+  return expr
+
 # use parse actions to attach EvalXXX constructors to sub-expressions
 operand.setParseAction(EvalConstant)
-arith_expr = infixNotation(operand,
+arith_expr = buildOperatorGrammar(operand,
     [
-     (signop, 1, opAssoc.RIGHT, EvalSignOp),
-     (multop, 2, opAssoc.LEFT, EvalMultOp),
-     (plusop, 2, opAssoc.LEFT, EvalAddOp),
+     (signop, 1, EvalSignOp),
+     (multop, 2, EvalMultOp),
+     (plusop, 2, EvalAddOp),
     ])
 
 comparisonop = oneOf("< <= > >= != == <> LT GT LE GE EQ NE")
-comp_expr = infixNotation(arith_expr,
+comp_expr = buildOperatorGrammar(arith_expr,
     [
-    (comparisonop, 2, opAssoc.LEFT, EvalComparisonOp),
+    (comparisonop, 2, EvalComparisonOp),
     ])
 
 def ParseExpression(text):
@@ -27,6 +27,7 @@ commands = [
     CMD_END,
     CMD_SWEEP,
     CMD_SET,
+    CMD_REQUIRE,
     CMD_GENERATE,
     CMD_USE,
     CMD_SOURCE,
@@ -0,0 +1,176 @@
+# A fast tokenizer for the common forms of Xenon commands.
+#
+# Running the pyparsing grammars on every line dominates the time to parse a
+# large Xenon file. Most lines are simple commands, like setting a parameter
+# to a number or sweeping it over a range, which can be recognized with a few
+# string operations. tokenizeLine() handles those lines and produces the same
+# parse results that the grammars in parser_builders would. Anything else is
+# left to the grammars.
+
+import re
+
+from xenon.base.keywords import *
+
+# Lines made of printable ASCII characters and tabs. pyparsing handles all
+# other lines, so that its syntax errors are reported as usual.
+ASCII_LINE = re.compile(r"[ -~\t]*$")
+IDENT = re.compile(r"[A-Za-z][A-Za-z0-9_]*$")
+# A dotted path of identifiers, optionally ending with .*, as in a selection
+# or a use command.
+PATH = re.compile(r"[A-Za-z][A-Za-z0-9_]*(\.[A-Za-z][A-Za-z0-9_]*)*(\.\*)?$")
+NUMBER = re.compile(r"[0-9]+$")
+# A non-empty string in double or single quotes, as in a set or source command.
+# Strings with a backslash are left to pyparsing, which converts escapes like
+# \t and \n.
+STRING = re.compile(r"\"([^\"\n\r\\]+)\"$|'([^'\n\r\\]+)'$")
+
+class TokenizedLine(object):
+  """ The parse results of a line, as returned by tokenizeLine().
+
+  Like pyparsing.ParseResults, results that were not set are empty strings.
+  """
+  def __init__(self, **results):
+    self.__dict__.update(results)
+
+  def __getattr__(self, name):
+    # Only called for attributes that were not set.
+    if name.startswith("__"):
+      raise AttributeError(name)
+    return ""
+
+def parseString_(word):
+  """ Return the contents of a quoted string, or None if word is not one. """
+  match = STRING.match(word)
+  if match is None:
+    return None
+  return match.group(1) or match.group(2)
+
+def splitPath_(word):
+  """ Return the tokens of a dotted path, or None if word is not one. """
+  if PATH.match(word) is None:
+    return None
+  return word.split(".")
+
+def tokenizeSelection_(words):
+  """ Tokenize an optional selection at the beginning of words.
+
+  Returns:
+    A (selection, rest) tuple, where selection is a list holding the tokens of
+    the selection (if any), and rest are the remaining words, or None if the
+    selection is not a simple one.
+  """
+  if words[0] != KW_FOR:
+    return [], words
+  if len(words) < 3:
+    return None
+  tokens = [LIT_STAR] if words[1] == LIT_STAR else splitPath_(words[1])
+  if tokens is None:
+    return None
+  return [tokens], words[2:]
+
+def tokenizeBegin_(words):
+  if len(words) == 2 and IDENT.match(words[0]) and IDENT.match(words[1]):
+    return TokenizedLine(sweep_class=words[0], sweep_name=words[1])
+  return None
+
+def tokenizeEnd_(words):
+  if len(words) == 1 and IDENT.match(words[0]):
+    return TokenizedLine(sweep_name=words[0])
+  return None
+
+def tokenizeGenerate_(words):
+  if len(words) == 1 and IDENT.match(words[0]):
+    return TokenizedLine(target=words[0])
+  return None
+
+def tokenizeUse_(words):
+  if len(words) == 1:
+    package_path = splitPath_(words[0])
+    if package_path is not None:
+      return TokenizedLine(package_path=package_path)
+  return None
+
+def tokenizeSource_(words):
+  source_file = parseString_(" ".join(words))
+  if source_file is not None:
+    return TokenizedLine(source_file=source_file)
+  return None
+
+def tokenizeSet_(words):
+  """ Tokenize a set command whose value is a number or a string. """
+  if not IDENT.match(words[0]) or len(words) < 2:
+    return None
+  selection = tokenizeSelection_(words[1:])
+  if selection is None:
+    return None
+  selection, value_words = selection
+  value = " ".join(value_words)
+  if NUMBER.match(value):
+    return TokenizedLine(param=words[0], selection=selection, constant=value)
+  string = parseString_(value)
+  if string is not None:
+    return TokenizedLine(param=words[0], selection=selection, string=string)
+  return None
+
+def tokenizeSweep_(words):
+  """ Tokenize a sweep command over a range. """
+  if not IDENT.match(words[0]) or len(words) < 2:
+    return None
+  selection = tokenizeSelection_(words[1:])
+  if selection is None:
+    return None
+  selection, range_words = selection
+  if (len(range_words) < 4 or len(range_words) > 6 or
+      range_words[0] != KW_FROM or not NUMBER.match(range_words[1]) or
+      range_words[2] != KW_TO or not NUMBER.match(range_words[3])):
+    return None
+  step_words = range_words[4:]
+  step_type = KW_LINSTEP
+  if step_words and step_words[0] in (KW_LINSTEP, KW_EXPSTEP):
+    step_type = step_words.pop(0)
+  step_amount = "1"
+  if step_words:
+    step_amount = step_words.pop(0)
+    if not NUMBER.match(step_amount):
+      return None
+  if step_words:
+    return None
+  sweep_range = TokenizedLine(
+      start=range_words[1], end=range_words[3],
+      step=TokenizedLine(type=step_type, amount=step_amount))
+  return TokenizedLine(sweep_param=words[0], selection=selection, range=sweep_range)
+
+TOKENIZERS_ = {
+  CMD_BEGIN:    tokenizeBegin_,
+  CMD_END:      tokenizeEnd_,
+  CMD_SWEEP:    tokenizeSweep_,
+  CMD_SET:      tokenizeSet_,
+  CMD_GENERATE: tokenizeGenerate_,
+  CMD_USE:      tokenizeUse_,
+  CMD_SOURCE:   tokenizeSource_,
+}
+
+def tokenizeLine(line):
+  """ Tokenize a stripped line of a Xenon file without pyparsing.
+
+  Returns:
+    None if the line could not be classified. It must then be parsed by the
+    command parser (see parser_builders.buildCommandParser()).
+
+    Otherwise, a (command, line, results) tuple, where command is the keyword
+    of the command, or "" if the line is blank or a comment, and line is the
+    line without its comment. results are the parse results of the line, or
+    None if the line must be parsed by the parser of its command.
+  """
+  if ASCII_LINE.match(line) is None:
+    return None
+  words = line.split("#", 1)[0].split()
+  if not words:
+    return "", "", None
+  command = words[0]
+  if command not in commands or len(words) < 2:
+    return None
+  line = command + " " + " ".join(words[1:])
+  tokenizer = TOKENIZERS_.get(command)
+  results = tokenizer(words[1:]) if tokenizer else None
+  return command, line, results
@@ -0,0 +1,112 @@
+# An on-disk cache of parsed Xenon files.
+
+import glob
+import hashlib
+import os
+import pickle
+import tempfile
+
+# The default directory of the parse cache. It can be overridden with the
+# XENON_PARSE_CACHE_DIR environment variable.
+DEFAULT_CACHE_DIR = os.environ.get(
+    "XENON_PARSE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "xenon"))
+
+# Cached command lists are only valid for the version of Xenon that parsed
+# them, which is identified by a hash of the Xenon sources that define the
+# parsers and the parsed objects. Computed once on first use.
+xenon_version_ = None
+
+def getXenonVersion():
+  """ Return a hash identifying the version of the Xenon parser and commands. """
+  global xenon_version_
+  if xenon_version_ is None:
+    version_hash = hashlib.sha256()
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for source_file in sorted(glob.glob(os.path.join(base_dir, "*.py"))):
+      with open(source_file, "rb") as f:
+        version_hash.update(f.read())
+    xenon_version_ = version_hash.hexdigest()
+  return xenon_version_
+
+def hashContents(data):
+  """ Return the SHA-256 hash of the bytes of a file. """
+  return hashlib.sha256(data).hexdigest()
+
+def hashFile(filename):
+  """ Return the SHA-256 hash of the contents of filename. """
+  with open(filename, "rb") as f:
+    return hashContents(f.read())
+
+class ParseCache(object):
+  """ Caches the commands parsed from Xenon files in a directory.
+
+  Each file is cached separately, keyed by the hash of its contents, the
+  directory it is in (which relative source paths are resolved against) and
+  the Xenon version. An entry also records the content hash of every file
+  sourced by the file, directly or transitively. The entry is only used if
+  none of them has changed since, so editing a shared settings file
+  invalidates the cache of every file that sources it.
+
+  Entries are written atomically, so several Xenon processes can share a cache
+  directory. An unreadable entry is treated as missing.
+  """
+  def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+    self.cache_dir = cache_dir
+
+  def getEntryPath_(self, filename, content_hash):
+    key = hashlib.sha256()
+    for part in [getXenonVersion(), os.path.dirname(filename), content_hash]:
+      key.update(part.encode("utf-8"))
+      key.update(b"\0")
+    return os.path.join(self.cache_dir, key.hexdigest() + ".pickle")
+
+  def load(self, filename, content_hash):
+    """ Return the cached commands of filename.
+
+    Args:
+      filename: The real absolute path of the file.
+      content_hash: The hash of the current contents of the file.
+
+    Returns:
+      A (commands, dependency_hashes) tuple, where dependency_hashes is a list
+      of (real path, content hash) tuples of all the files sourced by
+      filename, or None if filename is not cached or any of the files it
+      sources has changed.
+    """
+    entry_path = self.getEntryPath_(filename, content_hash)
+    if not os.path.exists(entry_path):
+      return None
+    try:
+      with open(entry_path, "rb") as f:
+        commands, dependency_hashes = pickle.load(f)
+    except Exception:
+      # A corrupt entry, or one that refers to objects that no longer exist.
+      return None
+    for dependency, dependency_hash in dependency_hashes:
+      if not os.path.exists(dependency) or hashFile(dependency) != dependency_hash:
+        return None
+    return commands, dependency_hashes
+
+  def store(self, filename, content_hash, commands, dependency_hashes):
+    """ Cache the commands parsed from filename.
+
+    content_hash and dependency_hashes are as in load(). They must be the
+    hashes of the contents that were parsed, so that a file modified while it
+    was being parsed is not cached under its new contents.
+
+    The cache is only an optimization, so if the entry cannot be written, like
+    when the cache directory is not writable, filename is not cached.
+    """
+    entry_path = self.getEntryPath_(filename, content_hash)
+    try:
+      if not os.path.exists(self.cache_dir):
+        os.makedirs(self.cache_dir, exist_ok=True)
+      fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+    except OSError:
+      return
+    try:
+      with os.fdopen(fd, "wb") as f:
+        pickle.dump((commands, dependency_hashes), f, pickle.HIGHEST_PROTOCOL)
+      os.replace(temp_path, entry_path)
+    except (OSError, pickle.PicklingError):
+      os.remove(temp_path)
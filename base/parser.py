@@ -1,8 +1,12 @@
 from collections import namedtuple
+import io
+import multiprocessing
 import os
 import sys
 
 from xenon.base.commands import *
+from xenon.base.line_tokenizer import tokenizeLine
+from xenon.base.parse_cache import hashContents
 from xenon.base.parser_builders import *
 
 Binding = namedtuple("Binding", "parserBuilder, commandClass")
@@ -12,6 +16,7 @@ BINDINGS_ = {
   CMD_END:      Binding(parserBuilder=buildEndParser, commandClass=EndCommand),
   CMD_SWEEP:    Binding(parserBuilder=buildSweepParser, commandClass=SweepCommand),
   CMD_SET:      Binding(parserBuilder=buildSetParser, commandClass=SetCommand),
+  CMD_REQUIRE:  Binding(parserBuilder=buildRequireParser, commandClass=RequireCommand),
   CMD_GENERATE: Binding(parserBuilder=buildGenerateParser, commandClass=GenerateCommand),
   CMD_USE:      Binding(parserBuilder=buildUseParser, commandClass=UseCommand),
   CMD_SOURCE:   Binding(parserBuilder=buildSourceParser, commandClass=SourceCommand),
@@ -22,6 +27,7 @@ BINDINGS_ = {
 # and return the built objects.
 PARSER_BUILDER_OBJS_ = dict((command, binding.parserBuilder())
                             for (command, binding) in BINDINGS_.items())
+LINE_PARSER_OBJ_ = buildCommandParser()
 
 def getParser(command):
   return PARSER_BUILDER_OBJS_[command]
@@ -30,50 +36,180 @@ def getCommandClass(command):
   """ Returns the class type for this command. """
   return BINDINGS_[command].commandClass
 
+# The number of lines that a worker process parses at a time.
+PARSE_CHUNK_SIZE = 2000
+
+def parseLine(line_number, line):
+  """ Parse a stripped, non-empty line of a Xenon file.
+
+  Returns:
+    The Command on the line, or None if the line is a comment.
+
+  Throws:
+    pyparsing.ParseException: if the line is not valid.
+  """
+  # Simple commands are tokenized without pyparsing.
+  tokenized = tokenizeLine(line)
+  if tokenized is not None:
+    line_command, line, result = tokenized
+    if line_command == "":
+      return None
+  else:
+    # Determine if this line begins with a valid command or not.
+    result = LINE_PARSER_OBJ_.parseString(line, parseAll=True)
+    if result.command == "":
+      return None
+    line_command = result.command
+    # Reform the line without the comments.
+    line = result.command + ' ' + ' '.join(result.rest[0])
+    result = None
+
+  # Otherwise, parse the line with the parser of its command.
+  if result is None:
+    result = getParser(line_command).parseString(line, parseAll=True)
+  return getCommandClass(line_command)(line_number, line, result)
+
+def parseLineChunk_(numbered_lines):
+  """ Parse a list of (line number, line) tuples, possibly in a worker process.
+
+  Returns:
+    A (commands, error_line_number) tuple. If a line is not valid, parsing
+    stops there, and error_line_number is its line number. Otherwise it is
+    None.
+  """
+  commands = []
+  for line_number, line in numbered_lines:
+    try:
+      command = parseLine(line_number, line)
+    except pp.ParseException:
+      return commands, line_number
+    if command is not None:
+      commands.append(command)
+  return commands, None
+
+# A file whose lines are being parsed. chunks is a list of the results of
+# parseLineChunk_, or of AsyncResults of them. If cached is not None, the file
+# was not parsed, and it holds the (commands, dependency_hashes) of the cache.
+PendingFile = namedtuple("PendingFile", "filename, content_hash, lines, chunks, cached")
+
 class XenonParser():
-  def __init__(self):
-    pass
+  def __init__(self, cache=None, jobs=1):
+    """ Construct a parser.
+
+    Args:
+      cache: If not None, a ParseCache. Files whose parsed commands are cached
+        there, and whose sourced files have not changed since, are not parsed
+        again, and newly parsed files are added to it.
+      jobs: The number of processes used to parse. If more than one, the lines
+        of each file are parsed in chunks of PARSE_CHUNK_SIZE lines by a pool
+        of worker processes, and all the files sourced by a file are parsed
+        concurrently.
+    """
+    self.cache = cache
+    self.jobs = jobs
+    self.pool_ = None
 
   def parse(self, filename, current_dir=""):
-    line_parser = buildCommandParser()
-    commands = []
+    if self.jobs <= 1:
+      commands, _ = self.parseFile_(filename, current_dir)
+      return commands
+    self.pool_ = multiprocessing.Pool(self.jobs)
+    try:
+      commands, _ = self.parseFile_(filename, current_dir)
+    finally:
+      self.pool_.terminate()
+      self.pool_.join()
+      self.pool_ = None
+    return commands
+
+  def parseFile_(self, filename, current_dir):
+    """ Parse filename and all the files it sources.
+
+    Returns:
+      A (commands, file_hashes) tuple, where file_hashes is a list of (real
+      path, content hash) tuples of filename, followed by the files it
+      sources directly or transitively.
+    """
+    return self.finishFile_(self.startFile_(filename, current_dir))
+
+  def startFile_(self, filename, current_dir):
+    """ Start parsing the lines of filename, and return a PendingFile.
+
+    Unless filename is cached, its lines are parsed right away, or submitted
+    to the worker processes if there are any.
+    """
     if not os.path.isabs(filename):
       filename = os.path.join(current_dir, filename)
-    with open(filename) as f:
+    filename = os.path.realpath(filename)
+    with open(filename, "rb") as f:
+      data = f.read()
+    content_hash = hashContents(data)
+    if self.cache is not None:
+      cached = self.cache.load(filename, content_hash)
+      if cached is not None:
+        return PendingFile(filename, content_hash, None, None, cached)
+
+    lines = []
+    with io.StringIO(data.decode("utf-8"), newline=None) as f:
       for line_number, line in enumerate(f):
         line_number += 1  # Line numbers aren't zero indexed.
         line = line.strip()
-        if not line:
-          continue
-        # Determine if this line begins with a valid command or not.
-        result = None
-        try:
-          result = line_parser.parseString(line, parseAll=True)
-          if result.command == "":
-            continue
-        except pp.ParseException as x:
-          self.handleSyntaxError(x, line_number)
-
-        # If so, parse the rest of the line.
-        line_command = result.command
-        try:
-          # Reform the line without the comments.
-          line = result.command + ' ' + ' '.join(result.rest[0])
-          result = getParser(result.command).parseString(line, parseAll=True)
-        except pp.ParseException as x:
-          self.handleSyntaxError(x, line_number)
-
-        command = getCommandClass(line_command)(line_number, line, result)
-
-        if isinstance(command, SourceCommand):
-          parser = XenonParser()
-          sourced_commands = parser.parse(
-              command.source_file,
-              current_dir=os.path.dirname(os.path.realpath(filename)))
-          commands.extend(sourced_commands)
-        else:
-          commands.append(command)
-    return commands
+        if line:
+          lines.append((line_number, line))
+    if self.pool_ is None:
+      chunks = [parseLineChunk_(lines)]
+    else:
+      chunks = [self.pool_.apply_async(parseLineChunk_, (lines[i:i + PARSE_CHUNK_SIZE],))
+                for i in range(0, max(len(lines), 1), PARSE_CHUNK_SIZE)]
+    return PendingFile(filename, content_hash, lines, chunks, None)
+
+  def finishFile_(self, pending_file):
+    """ Wait for the lines of a PendingFile, and expand its source commands.
+
+    Returns:
+      The same as parseFile_().
+    """
+    filename, content_hash = pending_file.filename, pending_file.content_hash
+    if pending_file.cached is not None:
+      commands, dependency_hashes = pending_file.cached
+      return commands, [(filename, content_hash)] + dependency_hashes
+
+    # Chunks are stitched together in line order, up to the first invalid line.
+    line_commands = []
+    error_line_number = None
+    for chunk in pending_file.chunks:
+      chunk_commands, error_line_number = (
+          chunk if isinstance(chunk, tuple) else chunk.get())
+      line_commands.extend(chunk_commands)
+      if error_line_number is not None:
+        break
+
+    # Start parsing all the sourced files before expanding any of them.
+    current_dir = os.path.dirname(filename)
+    sourced_files = [self.startFile_(command.source_file, current_dir)
+                     for command in line_commands if isinstance(command, SourceCommand)]
+    sourced_files.reverse()
+    commands = []
+    dependency_hashes = []
+    for command in line_commands:
+      if isinstance(command, SourceCommand):
+        sourced_commands, sourced_hashes = self.finishFile_(sourced_files.pop())
+        commands.extend(sourced_commands)
+        dependency_hashes.extend(sourced_hashes)
+      else:
+        commands.append(command)
+
+    if error_line_number is not None:
+      # Parse the invalid line again to report the error.
+      line = dict(pending_file.lines)[error_line_number]
+      try:
+        parseLine(error_line_number, line)
+      except pp.ParseException as x:
+        self.handleSyntaxError(x, error_line_number)
+
+    if self.cache is not None:
+      self.cache.store(filename, content_hash, commands, dependency_hashes)
+    return commands, [(filename, content_hash)] + dependency_hashes
 
   def handleSyntaxError(self, parser_err, line_number):
     spaces =  ' ' * (parser_err.col - 1)
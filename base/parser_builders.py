@@ -51,7 +51,7 @@ def buildExpressionParser():
   evaluated.
   """
   kws = MatchFirst(map(Keyword, [k for k in reserved]))
-  valid_expression = Group(OneOrMore(Word(alphanums + "()/+-<>=._*")))
+  valid_expression = Group(OneOrMore(Word(alphanums + "()/+-<>=!._*")))
   return valid_expression.setResultsName("expression").setParseAction(convertToExpressionTree)
 
 def buildListParser():
@@ -96,6 +96,14 @@ def buildSetParser():
   )
   return set_parser
 
+def buildRequireParser():
+  """ A require command is specified by the following BNF:
+
+  require = "require" expression
+  """
+  require_parser = reserved[CMD_REQUIRE] + buildExpressionParser()
+  return require_parser
+
 def buildRangeParser():
   """ A range is specified by the following BNF:
 
@@ -0,0 +1,134 @@
+# Random access to the configs of a generated sweep output.
+
+import csv
+import json
+import mmap
+import numpy as np
+import os
+import re
+
+from xenon.generators.exhaustive_configs import INDEX_ENTRY
+
+class ConfigReader(object):
+  """ Reads single configs from an output file written by ConfigGenerator.run().
+
+  The output file is memory-mapped, and the offset index written next to it
+  (<output>.idx) locates each config. Configs are looked up by their config
+  index, the same index that --config-index takes, rather than by their
+  position in the file. The two differ when a require constraint excludes
+  configs, or when the file is a shard. Reading config k only touches the
+  bytes of that config, however large the file is, so many jobs can each pick
+  their own config out of a shared output.
+
+  When the config indices in the file are contiguous, as they are without
+  constraints, config k is found in constant time. Otherwise, it is found by
+  a binary search over the config indices in the index.
+
+  JSON, JSON Lines and CSV outputs are supported, but not compressed ones.
+  Configs are returned as dicts, in the same form as in the JSON output. For
+  CSV outputs, they are rebuilt from the rows and the schema file.
+
+  Usage:
+
+    with ConfigReader("outputs/mysweep.json") as reader:
+      config = reader[k]
+  """
+  def __init__(self, file_name):
+    """ Open an output file and its offset index.
+
+    Throws:
+      IOError: if the output file or its offset index does not exist.
+    """
+    self.file_name = file_name
+    self.schema = None
+    if file_name.endswith(".csv"):
+      schema_file_name = re.sub(r"(\.shard\d+of\d+)?\.csv$", ".schema.json", file_name)
+      with open(schema_file_name, "r") as f:
+        self.schema = json.load(f)
+    self.file_ = open(file_name, "rb")
+    index_file_name = file_name + ".idx"
+    num_configs = os.path.getsize(index_file_name) // INDEX_ENTRY.size
+    if num_configs:
+      self.index = np.memmap(index_file_name, dtype="<u8", mode="r", shape=(num_configs, 3))
+      self.data = mmap.mmap(self.file_.fileno(), 0, access=mmap.ACCESS_READ)
+    else:
+      # Empty files cannot be memory-mapped.
+      self.index = np.empty((0, 3), dtype="<u8")
+      self.data = None
+    # Configs are written in increasing config index order, so this column is
+    # sorted.
+    self.config_indices = self.index[:, 0]
+    # If the config indices are contiguous, the first one, so that config k
+    # is at position k - first_config_index_. Otherwise, None.
+    self.first_config_index_ = None
+    if num_configs and self.config_indices[-1] - self.config_indices[0] == num_configs - 1:
+      self.first_config_index_ = int(self.config_indices[0])
+
+  def __len__(self):
+    return len(self.index)
+
+  def __contains__(self, k):
+    return self.findConfig_(k) is not None
+
+  def __getitem__(self, k):
+    """ Return the config with config index k as a dict.
+
+    Throws:
+      IndexError: if the file has no config with config index k.
+    """
+    position = self.findConfig_(k)
+    if position is None:
+      raise IndexError("Config %d is not in %s." % (k, self.file_name))
+    return self.readConfig_(position)
+
+  def __iter__(self):
+    """ Iterate over the configs of the file, in file order. """
+    for position in range(len(self)):
+      yield self.readConfig_(position)
+
+  def findConfig_(self, k):
+    """ Return the position in the file of config index k, or None. """
+    if k < 0:
+      return None
+    if self.first_config_index_ is not None:
+      position = k - self.first_config_index_
+      return position if 0 <= position < len(self) else None
+    position = int(np.searchsorted(self.config_indices, k))
+    if position == len(self) or self.config_indices[position] != k:
+      return None
+    return position
+
+  def readConfig_(self, position):
+    _, start, end = self.index[position]
+    encoded = self.data[int(start):int(end)].decode("utf-8")
+    if self.schema is None:
+      return json.loads(encoded)
+    return self.decodeCsvRow_(encoded)
+
+  def decodeCsvRow_(self, encoded):
+    """ Rebuild a dictified config from a CSV row and the schema. """
+    config = {}
+    def setValue(keys, value):
+      obj = config
+      for key in keys[:-1]:
+        obj = obj.setdefault(key, {})
+      obj[keys[-1]] = value
+    for constant in self.schema["constants"]:
+      setValue(constant["keys"], constant["value"])
+    row = next(csv.reader([encoded]))
+    for column, cell in zip(self.schema["columns"], row):
+      setValue(column["keys"], cell if column["type"] == "str" else json.loads(cell))
+    return config
+
+  def close(self):
+    if self.data is not None:
+      self.data.close()
+    self.index = None
+    self.config_indices = None
+    self.file_.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
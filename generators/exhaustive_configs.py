@@ -1,15 +1,102 @@
+import bz2
+import collections
+import concurrent.futures
+import gzip
 import itertools
 import json
+import lzma
+import multiprocessing
 import numpy as np
+import operator
 import os
+import sqlite3
+import struct
 import sys
+import time
+import urllib.parse
 
 import xenon.base.common as common
 import xenon.base.exceptions as xe
 from xenon.base.datatypes import *
-from xenon.base.expressions import Expression
+from xenon.base.expressions import Expression, FoldedConstant
+from xenon.base.keywords import LIT_STAR
 from xenon.generators import base_generator
 
+# Ways of dividing the configs of a sweep into shards.
+# Each shard is a contiguous block of config indices.
+SHARD_BLOCK = "block"
+# Shard i of N holds every Nth config index, starting from i.
+SHARD_STRIDE = "stride"
+
+# Output formats of a set of configs.
+# A JSON array of configs, pretty-printed.
+FORMAT_JSON = "json"
+# JSON Lines: one compact JSON object per config, one per line.
+FORMAT_JSONL = "jsonl"
+# The schema of the configs, written once, and a CSV row of values per config.
+FORMAT_CSV = "csv"
+
+# Upper bound on the number of configs that a worker process generates and
+# encodes per task.
+MAX_CHUNK_SIZE = 256
+
+# Number of configs whose expressions are evaluated together as NumPy arrays.
+BATCH_SIZE = 1024
+
+# An entry of the offset index of an output file: the config index of an
+# encoded config, and the byte offsets of its start and its end.
+INDEX_ENTRY = struct.Struct("<QQQ")
+
+# Compressions of output files, as named by the output_compression attribute
+# of a sweep, mapped to the file name extension, the function that opens a
+# compressed file, and the name of its argument for the compression level.
+OUTPUT_COMPRESSIONS = {
+  "gzip": (".gz", gzip.open, "compresslevel"),
+  "bz2": (".bz2", bz2.open, "compresslevel"),
+  "lzma": (".xz", lzma.open, "preset"),
+}
+
+# Directory layouts of per-config output files, as named by the output_layout
+# attribute of a sweep.
+# One directory level per swept parameter, named <param>=<value>.
+LAYOUT_HIVE = "hive"
+# Numbered directories that each hold the files of a block of config indices.
+LAYOUT_BUCKETS = "buckets"
+
+# Number of config indices per directory with LAYOUT_BUCKETS, unless the sweep
+# sets output_bucket_size.
+DEFAULT_BUCKET_SIZE = 1000
+
+# Number of threads that write per-config output files, and the maximum number
+# of encoded configs waiting to be written.
+WRITE_THREADS = 8
+MAX_PENDING_WRITES = 64
+
+# The name of the column of the SQLite output that holds the config index.
+SQLITE_CONFIG_INDEX = "config_index"
+
+# The declared SQLite column type for each type of a column of a SweepPlan
+# schema. Columns of other types are declared without a type.
+SQLITE_TYPES = {
+  "int": "INTEGER",
+  "bool": "INTEGER",
+  "float": "REAL",
+  "str": "TEXT",
+}
+
+# Number of configs that are generated to estimate the size of a sweep.
+ESTIMATE_SAMPLES = 64
+
+# The projected cost of generating a sweep, as returned by
+# ConfigGenerator.estimate().
+SweepEstimate = collections.namedtuple(
+    "SweepEstimate",
+    "num_configs, num_valid_configs, num_samples, json_size, generation_time")
+
+# Interned attribute names of SweepableViews without children, which are most
+# views and usually have the same attributes as the other views of their class.
+view_attrs_ = {}
+
 class SweepableView(XenonObj):
   """ An overlay for Sweepable objects.
 
@@ -18,27 +105,59 @@ class SweepableView(XenonObj):
   values that does not modify any state of the wrapped Sweepable object. When
   fully generated, a SweepableView can be dumped in JSON form and reformatted
   by a backend for some target output.
+
+  Views of the objects of a class usually have the same attributes, so views
+  without children share their tuple of attribute names.
   """
-  def __init__(self, sweepable_obj):
+  def __init__(self, sweepable_obj, all_views=None):
+    """ Construct a view of sweepable_obj and, recursively, its children.
+
+    Args:
+      sweepable_obj: The Sweepable object to wrap.
+      all_views: An optional list. If provided, this view and every child view
+        are appended to it in preorder, with children in sorted name order,
+        and each view records its position in the list as view_index_.
+    """
     super(SweepableView, self).__init__()
+    if all_views is not None:
+      self.view_index_ = len(all_views)
+      all_views.append(self)
     # Wrap the sweepable object so we can access its range.
     self.sweepable = sweepable_obj
-    # A list of attributes that we've copied from sweepable_obj.
-    self.attrs = []
+    # The sweepable attributes and Sweepable children of sweepable_obj, and an
+    # attribute for the type name.
+    names = [name for name in self.sweepable.user_attrs
+             if not isinstance(getattr(self.sweepable, name), Sweepable)]
+    child_names = list(self.sweepable.iterattrkeys(objtype=Sweepable))
+    attrs = tuple(names + child_names + ["type"])
+    self.attrs = view_attrs_.setdefault(attrs, attrs) if not child_names else attrs
     # Copy the sweepable attributes from sweepable_obj.
-    for name in self.sweepable.user_attrs:
-      value = getattr(self.sweepable, name)
-      if not isinstance(value, Sweepable):
-        setattr(self, name, value)
-        self.attrs.append(name)
+    for name in names:
+      setattr(self, name, getattr(self.sweepable, name))
     # Recursively copy all Sweepable children from sweepable_obj.
-    for child_name, child in self.sweepable.iterattritems(objtype=Sweepable):
-      setattr(self, child_name, SweepableView(child))
-      self.attrs.append(child_name)
-    # Make an attribute for the type name.
-    self.attrs.append("type")
+    for child_name in child_names:
+      setattr(self, child_name,
+              SweepableView(getattr(self.sweepable, child_name), all_views))
     setattr(self, "type", sweepable_obj.__class__.__name__)
 
+  def registerAttr_(self, attr, value):
+    # The wrapped object and the unassigned params copied from its user_attrs
+    # are always checked by iterattrkeys(), so most views do not need a
+    # registry.
+    if attr == "sweepable" or (isinstance(value, UnassignedParamValue) and
+                               attr in self.getSweepableUserAttrs_()):
+      value = None
+    super(SweepableView, self).registerAttr_(attr, value)
+
+  def getXenonObjAttrs_(self):
+    attrs = super(SweepableView, self).getXenonObjAttrs_().union(
+        self.getSweepableUserAttrs_())
+    return attrs.union(["sweepable"])
+
+  def getSweepableUserAttrs_(self):
+    sweepable = getattr(self, "sweepable", None)
+    return sweepable.user_attrs if isinstance(sweepable, Sweepable) else ()
+
   def dump(self, stream=sys.stdout):
     dictified = self.dictify()
     json.dump(dictified, stream, sort_keys=True, indent=2)
@@ -65,106 +184,1250 @@ class SweepableView(XenonObj):
     return "{0}(\"{1}\")".format(
         self.sweepable.__class__.__name__, self.sweepable.name)
 
+class ConfigView(SweepableView):
+  """ A SweepableView of a single config, stored as a template plus an overlay.
+
+  Most attributes have the same value in every config of a sweep, so all
+  configs share a single template SweepableView tree that holds those values.
+  A ConfigView only owns a list of the values that differ between configs,
+  namely swept values and the results of expressions, and looks up everything
+  else in the template. Child views are created on access and share the same
+  list of values, so the cost of a config depends on the number of swept
+  attributes rather than on the size of the data model.
+
+  ConfigViews are read-only.
+  """
+  def __init__(self, template, view_slots, values):
+    """ Construct a view of the template with the given overlaid values.
+
+    Args:
+      template: The SweepableView (from a SweepPlan template) to overlay.
+      view_slots: A list indexed by view_index_, where each element maps the
+        attribute names of that view to their positions in values.
+      values: The per-config values.
+    """
+    self.template_ = template
+    self.view_slots_ = view_slots
+    self.values_ = values
+
+  def __getattr__(self, name):
+    # This is only called for attributes that are not set on this object,
+    # which is anything but the private attributes above.
+    if name.endswith("_"):
+      raise AttributeError(name)
+    slot = self.view_slots_[self.template_.view_index_].get(name)
+    if slot is not None:
+      return self.values_[slot]
+    value = getattr(self.template_, name)
+    if isinstance(value, SweepableView):
+      return ConfigView(value, self.view_slots_, self.values_)
+    return value
+
+  def __setattr__(self, attr, value):
+    if not attr.endswith("_"):
+      raise AttributeError("ConfigView attribute %s is read-only." % attr)
+    self.__dict__[attr] = value
+
+  def iterattrkeys(self, objtype=object):
+    for attr in self.template_.attrs:
+      if isinstance(getattr(self, attr), objtype):
+        yield attr
+
+  def dictify_recursive_(self):
+    slots = self.view_slots_[self.template_.view_index_]
+    children = {}
+    for attr_name in self.template_.attrs:
+      slot = slots.get(attr_name)
+      if slot is not None:
+        children[attr_name] = self.values_[slot]
+        continue
+      attr_value = getattr(self.template_, attr_name)
+      if isinstance(attr_value, SweepableView):
+        child = ConfigView(attr_value, self.view_slots_, self.values_)
+        children[str(attr_value)] = child.dictify_recursive_()
+      else:
+        children[attr_name] = attr_value
+    return children
+
+class OutputFormat(object):
+  """ Describes how a set of configs is written.
+
+  Subclasses define how a config is encoded with encode(config) and the
+  following strings, which are written before the first config, between two
+  configs, after the last config, and instead of all of these if there are no
+  configs, respectively.
+  """
+  extension = ""
+  prefix = ""
+  separator = ""
+  suffix = ""
+  empty = ""
+  # Whether dumpSchema() writes a schema that describes every config.
+  has_schema = False
+
+  def __init__(self, plan=None):
+    """ Construct the format for the configs of a SweepPlan. """
+    pass
+
+  def encode(self, config):
+    raise NotImplementedError()
+
+class JsonFormat(OutputFormat):
+  """ A JSON array of configs.
+
+  The output is identical to that of json.dump(list_of_configs,
+  sort_keys=True, indent=2).
+  """
+  extension = ".json"
+  prefix = "[\n"
+  separator = ",\n"
+  suffix = "\n]"
+  empty = "[]"
+
+  @staticmethod
+  def encode(config):
+    """ Encode a single config as it appears as an element of the JSON array. """
+    encoded = json.dumps(config.dictify(), sort_keys=True, indent=2)
+    return "  " + encoded.replace("\n", "\n  ")
+
+class JsonLinesFormat(OutputFormat):
+  """ One compact JSON object per line.
+
+  Each line can be parsed on its own, so consumers can stream the file, seek
+  to a config by line, or split the file without parsing all of it.
+  """
+  extension = ".jsonl"
+  prefix = ""
+  separator = "\n"
+  suffix = "\n"
+  empty = ""
+
+  @staticmethod
+  def encode(config):
+    return json.dumps(config.dictify(), sort_keys=True, separators=(",", ":"))
+
+class CsvFormat(OutputFormat):
+  """ A schema of the configs, written once, and one CSV row per config.
+
+  Every config of a sweep has the same structure, and most of its values are
+  the same in every config. The schema lists each attribute of a config once:
+  its name (the path used to select it in a Xenon file), its path of keys in
+  the JSON output, and its type. Attributes that have the same value in every
+  config are constants, whose value is stored in the schema. The others are
+  columns, whose values are stored in the CSV rows, in order. The first row is
+  a header with the names of the columns.
+
+  Cells of columns of type str hold the string itself. All other cells hold a
+  JSON value.
+  """
+  extension = ".csv"
+  separator = "\n"
+  suffix = "\n"
+  has_schema = True
+
+  def __init__(self, plan):
+    super(CsvFormat, self).__init__(plan)
+    self.schema = plan.getSchema()
+    self.is_str_column = [column["type"] == "str" for column in self.schema["columns"]]
+    self.prefix = ",".join(
+        CsvFormat.quote_(column["name"]) for column in self.schema["columns"]) + "\n"
+    self.empty = self.prefix
+
+  def dumpSchema(self, stream):
+    json.dump(self.schema, stream, sort_keys=True, indent=2)
+
+  def encode(self, config):
+    return ",".join(
+        CsvFormat.quote_(value if is_str else json.dumps(value))
+        for value, is_str in zip(config.values_, self.is_str_column))
+
+  @staticmethod
+  def quote_(cell):
+    """ Quote a CSV cell if it contains a special character. """
+    if any(c in cell for c in ",\"\r\n"):
+      return "\"" + cell.replace("\"", "\"\"") + "\""
+    return cell
+
+OUTPUT_FORMATS = {
+  FORMAT_JSON: JsonFormat,
+  FORMAT_JSONL: JsonLinesFormat,
+  FORMAT_CSV: CsvFormat,
+}
+
+def getByteLength_(text):
+  """ Return the length of text encoded as UTF-8. """
+  return len(text) if text.isascii() else len(text.encode("utf-8"))
+
 class ConfigSet(object):
   """ A wrapper for the set of configurations generated from a design sweep.
 
   The only purpose of this class is to dump the complete list of configurations
-  as a valid JSON file.
+  in one of the OUTPUT_FORMATS. Configurations are consumed from an iterable
+  one at a time, so the set of configurations never has to fit in memory at
+  once.
   """
-  def __init__(self, configs):
-    # List of generated configurations, where each config is dict.
+  def __init__(self, configs, output_format=JsonFormat(), config_indices=None):
+    # Iterable of generated configurations, where each config is a
+    # SweepableView. This is usually a generator.
     self.configs = configs
+    self.output_format = output_format
+    # Optional iterable of the config index of each config, in the same order
+    # as configs. By default, configs are numbered from 0.
+    self.config_indices = config_indices
 
-  def dump(self, stream=sys.stdout):
-    json_repr = [config.dictify() for config in self.configs]
-    json.dump(json_repr, stream, sort_keys=True, indent=2)
+  def dump(self, stream=sys.stdout, index_stream=None):
+    """ Stream the configurations to stream in the output format.
+
+    Each configuration is encoded and written as soon as it is generated.
+
+    Args:
+      stream: The text stream to write the configurations to.
+      index_stream: An optional binary stream. If provided, an INDEX_ENTRY is
+        written to it for each configuration: its config index and the byte
+        offsets in stream of the start and the end of the encoded
+        configuration, as little-endian unsigned 64-bit integers.
+    """
+    output_format = self.output_format
+    is_empty = True
+    offset = 0
+    for config_index, encoded in self.iterencoded():
+      delimiter = output_format.separator if not is_empty else output_format.prefix
+      stream.write(delimiter)
+      stream.write(encoded)
+      is_empty = False
+      if index_stream is not None:
+        start = offset + getByteLength_(delimiter)
+        offset = start + getByteLength_(encoded)
+        index_stream.write(INDEX_ENTRY.pack(config_index, start, offset))
+    stream.write(output_format.empty if is_empty else output_format.suffix)
+
+  def iterencoded(self):
+    """ Generator over (config index, encoded config) tuples. """
+    config_indices = self.config_indices
+    if config_indices is None:
+      config_indices = itertools.count()
+    for config_index, config in zip(config_indices, self.configs):
+      yield config_index, self.output_format.encode(config)
+
+# The ConfigGenerator used by a worker process of a ParallelConfigSet.
+WORKER_GENERATOR_ = None
+
+def initWorker_(generator):
+  global WORKER_GENERATOR_
+  WORKER_GENERATOR_ = generator
+
+def encodeConfigChunk_(config_indices):
+  """ Generate and encode a chunk of configs in a worker process.
+
+  Returns:
+    A list of (config index, encoded config) tuples.
+  """
+  output_format = WORKER_GENERATOR_.output_format
+  return [(config_index, output_format.encode(config)) for config_index, config in
+          WORKER_GENERATOR_.iterindexedconfigs_(config_indices)]
+
+class ParallelConfigSet(ConfigSet):
+  """ A ConfigSet whose configs are generated and encoded by worker processes.
+
+  The config indices are split into chunks that a pool of processes generates
+  and encodes independently. The encoded chunks are written in order, so the
+  output is identical to that of a sequential ConfigSet. Only a bounded
+  number of chunks are in flight at any time, so memory stays flat no matter
+  how many configs there are.
+  """
+  def __init__(self, generator, config_indices, jobs):
+    """ Construct a parallel ConfigSet.
+
+    Args:
+      generator: The ConfigGenerator that workers use to build configs.
+      config_indices: A sequence (usually a range) of config indices.
+      jobs: The number of worker processes.
+    """
+    super(ParallelConfigSet, self).__init__(None, generator.output_format)
+    self.generator = generator
+    self.config_indices = config_indices
+    self.jobs = jobs
+    self.chunk_size = max(1, min(MAX_CHUNK_SIZE, len(config_indices) // (4 * jobs)))
+
+  def iterchunks(self):
+    for start in range(0, len(self.config_indices), self.chunk_size):
+      yield self.config_indices[start:start + self.chunk_size]
+
+  def iterencoded(self):
+    for encoded_chunk in self.iterencodedchunks_():
+      for indexed_encoded in encoded_chunk:
+        yield indexed_encoded
+
+  def iterencodedchunks_(self):
+    pool = multiprocessing.Pool(
+        self.jobs, initializer=initWorker_, initargs=(self.generator,))
+    try:
+      pending = collections.deque()
+      for chunk in self.iterchunks():
+        pending.append(pool.apply_async(encodeConfigChunk_, (chunk,)))
+        if len(pending) >= 2 * self.jobs:
+          yield pending.popleft().get()
+      while pending:
+        yield pending.popleft().get()
+    finally:
+      pool.terminate()
+      pool.join()
+
+class SweepPlan(object):
+  """ A flattened description of how to build a config from its indices.
+
+  Every config of a sweep has the same shape: the same tree of SweepableViews,
+  where the same attributes are swept, hold expressions, or take their default
+  values. Only the values differ. A SweepPlan walks the tree once and records
+  each of these attributes as a slot, which is a (view index, attribute name)
+  pair. View indices refer to the list of views that SweepableView collects in
+  preorder.
+
+  The walked tree is kept as a template that is shared by every config. All
+  values that are the same across configs, including defaults, are assigned
+  to the template once. A config is then just the list of values of the swept
+  and expression slots, in that order, overlaid on the template by a
+  ConfigView.
+
+  Expressions are compiled into functions of that list of values: selections
+  of swept or expression slots become direct lookups into the list, and
+  selections of anything else are folded into constants. While compiling, the
+  plan also records which swept parameters each expression depends on, either
+  directly or through other expressions, so that an expression only needs to
+  be evaluated again when one of those parameters changes.
+
+  The constraints of the sweep are compiled the same way. Each one can be
+  checked as soon as the last param it depends on is known.
+  """
+  def __init__(self, sweep, param_ids):
+    """ Compile the plan for a sweep.
+
+    Args:
+      sweep: The configured sweep.
+      param_ids: The sorted list of swept param ids. The position of a param
+        id in this list is the position of its sweep range index in the
+        indices of a config.
+    """
+    views = []
+    self.template = SweepableView(sweep, views)
+    self.num_params = len(param_ids)
+    param_positions = dict((param_id, i) for i, param_id in enumerate(param_ids))
+    # List of (view index, attribute, param position, sweep range).
+    self.sweep_slots = []
+    # List of (view index, attribute, expression), in evaluation order.
+    self.expression_slots = []
+    # List of (view index, attribute, default value).
+    self.default_slots = []
+    for view_index, view in enumerate(views):
+      swept_attrs = set()
+      for param_id, param_range in view.sweepable.iterparamitems():
+        if param_id in param_positions:
+          attr = view.sweepable.getParamName(param_id)
+          self.sweep_slots.append(
+              (view_index, attr, param_positions[param_id], param_range))
+          swept_attrs.add(attr)
+      for attr in view.attrs:
+        if attr in swept_attrs:
+          continue
+        value = getattr(view, attr)
+        if isinstance(value, Expression):
+          self.expression_slots.append((view_index, attr, value))
+        elif isinstance(value, UnassignedParamValue):
+          self.default_slots.append(
+              (view_index, attr, view.sweepable.getParamDefaultValue(attr)))
+
+    for view_index, attr, default in self.default_slots:
+      setattr(views[view_index], attr, default)
+
+    # For each view, a map from the attributes that are overlaid to their
+    # positions in the list of values of a config.
+    self.view_slots = [{} for view in views]
+    overlaid_slots = (
+        [(view_index, attr) for view_index, attr, _, _ in self.sweep_slots] +
+        [(view_index, attr) for view_index, attr, _ in self.expression_slots])
+    for position, (view_index, attr) in enumerate(overlaid_slots):
+      self.view_slots[view_index][attr] = position
+
+    # The sweep range of each sweep slot as a 1-D object array, so that the
+    # values of a batch of configs can be gathered with one indexing operation.
+    # Ranges are copied into lists first, since the ranges of sweeps over a list
+    # are pyparsing ParseResults, which NumPy cannot assign from.
+    self.sweep_slot_arrays = []
+    for _, _, _, param_range in self.sweep_slots:
+      param_array = np.empty(len(param_range), dtype=object)
+      param_array[:] = list(param_range)
+      self.sweep_slot_arrays.append(param_array)
+
+    self.constraints = list(sweep.constraints_)
+    self.compileExpressions_()
+
+  def compileExpressions_(self):
+    self.expression_fns = []
+    self.batch_expression_fns = []
+    # For each expression slot, the set of param positions it depends on.
+    self.expression_deps = []
+    # For each expression slot, the expression slots that it reads.
+    self.expression_inputs = []
+    for i, (_, _, expression) in enumerate(self.expression_slots):
+      accessed_slots = set()
+      resolver = (lambda selection, accessed_slots=accessed_slots:
+                  self.resolveSelection_(selection, accessed_slots))
+      self.expression_fns.append(expression.compile(resolver))
+      self.batch_expression_fns.append(expression.compile(resolver, batch=True))
+      deps, inputs = self.collectDependencies_(accessed_slots, i)
+      self.expression_deps.append(deps)
+      self.expression_inputs.append(inputs)
+
+    # Constraints are checked in order of the last param position they depend
+    # on, so that the first violated constraint rules out as many configs as
+    # possible.
+    compiled_constraints = []
+    constraint_inputs = set()
+    for constraint in self.constraints:
+      accessed_slots = set()
+      constraint_fn = constraint.compile(
+          lambda selection: self.resolveSelection_(selection, accessed_slots))
+      deps, inputs = self.collectDependencies_(
+          accessed_slots, len(self.expression_slots))
+      compiled_constraints.append((max(deps) if deps else -1, constraint_fn))
+      constraint_inputs.update(inputs)
+    compiled_constraints.sort(key=lambda constraint: constraint[0])
+    self.constraint_levels = [level for level, _ in compiled_constraints]
+    self.constraint_fns = [constraint_fn for _, constraint_fn in compiled_constraints]
+    # The expression slots that have to be evaluated to check the constraints,
+    # including the ones that those expressions read in turn.
+    pending = list(constraint_inputs)
+    while pending:
+      for i in self.expression_inputs[pending.pop()]:
+        if i not in constraint_inputs:
+          constraint_inputs.add(i)
+          pending.append(i)
+    self.constraint_expression_slots = sorted(constraint_inputs)
+
+  def collectDependencies_(self, accessed_slots, num_evaluated):
+    """ Find what an expression that reads accessed_slots depends on.
+
+    Args:
+      accessed_slots: The slots that the expression reads.
+      num_evaluated: The number of expression slots that are evaluated before
+        this expression.
+
+    Returns:
+      A (deps, inputs) tuple, where deps is a frozenset of the param positions
+      the expression depends on, directly or through other expressions, and
+      inputs is the set of expression slots that it reads.
+    """
+    num_sweep_slots = len(self.sweep_slots)
+    deps = set()
+    inputs = set()
+    for slot in accessed_slots:
+      if slot < num_sweep_slots:
+        deps.add(self.sweep_slots[slot][2])
+      elif slot - num_sweep_slots < num_evaluated:
+        deps.update(self.expression_deps[slot - num_sweep_slots])
+        inputs.add(slot - num_sweep_slots)
+      else:
+        # An expression that is evaluated later. Its value is never
+        # available, so depend on everything to never reuse a result.
+        deps.update(range(self.num_params))
+    return frozenset(deps), inputs
+
+  def resolveSelection_(self, selection, accessed_slots=None):
+    """ Resolve a selection in an expression against the template.
+
+    If accessed_slots is given, any slot that the selection refers to is added
+    to it.
+
+    Returns:
+      A function that looks up the slot in the list of values of a config if
+      the selection refers to a swept or expression slot, or otherwise a
+      FoldedConstant with the value of the selected attribute.
+    """
+    selection_path = ".".join(selection)
+    current_view = self.template
+    for i, token in enumerate(selection):
+      if token == LIT_STAR:
+        raise SyntaxError(
+            "%s: * is not a valid selection in an expression." % selection_path)
+      if isinstance(current_view, SweepableView):
+        slot = self.view_slots[current_view.view_index_].get(token)
+        if slot is not None:
+          if i != len(selection) - 1:
+            raise xe.XenonSelectionError(selection_path)
+          if accessed_slots is not None:
+            accessed_slots.add(slot)
+          return operator.itemgetter(slot)
+      try:
+        current_view = getattr(current_view, token)
+      except AttributeError:
+        raise xe.XenonSelectionError(selection_path)
+    return FoldedConstant(current_view)
+
+  def __getstate__(self):
+    # Compiled expressions cannot be pickled, so they are compiled again
+    # after unpickling.
+    state = self.__dict__.copy()
+    del state["expression_fns"]
+    del state["batch_expression_fns"]
+    del state["constraint_fns"]
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self.compileExpressions_()
+
+  def build(self, indices):
+    """ Build the config with these sweep range indices.
+
+    Swept values are assigned first, then expressions are evaluated with the
+    top level view of the config as their scope. The only expressions left at
+    this point are those that could not be evaluated when their set command
+    was executed, because they reference a swept attribute.
+
+    Args:
+      indices: A tuple of sweep range indices, ordered like param_ids.
+
+    Returns:
+      A ConfigView of the config.
+    """
+    values = [param_range[indices[param_position]] for
+              _, _, param_position, param_range in self.sweep_slots]
+    # Until it is evaluated, an expression slot holds the expression itself.
+    values.extend(expression for _, _, expression in self.expression_slots)
+    self.evalExpressions_(indices, values, range(len(self.expression_slots)))
+    return ConfigView(self.template, self.view_slots, values)
+
+  def evalExpressions_(self, indices, values, expression_slots, previous=None):
+    """ Evaluate expression slots of a single config, in order.
+
+    Args:
+      indices: The sweep range indices of the config.
+      values: The list of values of the config. The result of each evaluated
+        expression is stored in it.
+      expression_slots: The numbers of the expression slots to evaluate.
+      previous: An optional (indices, values) pair of a config that was
+        evaluated before. Expressions whose dependencies have the same indices
+        in both configs reuse their previous value instead.
+    """
+    first_expression_slot = len(self.sweep_slots)
+    if previous is not None:
+      previous_indices, previous_values = previous
+      changed = frozenset(position for position, (index, previous_index) in
+                          enumerate(zip(indices, previous_indices))
+                          if index != previous_index)
+    for i in expression_slots:
+      slot = first_expression_slot + i
+      if previous is not None and self.expression_deps[i].isdisjoint(changed):
+        values[slot] = previous_values[slot]
+      else:
+        values[slot] = self.expression_fns[i](values)
+
+  def getSchema(self):
+    """ Describe the flattened structure of every config of this plan.
+
+    Each attribute of a config is described by its name (the path of
+    attribute names used to select it in a Xenon file), its path of keys in
+    the dictified config, and its type.
+
+    Returns:
+      A dict with two lists of attribute descriptions. "columns" describes the
+      attributes that are overlaid in a config, in the order of the list of
+      values of a config. Their type is that of the values of their sweep
+      range (or "mixed"), or "expression". "constants" describes every other
+      attribute, along with its "value", which is the same in every config.
+    """
+    # The path of attribute names and the path of keys of each view.
+    view_names = {self.template.view_index_: []}
+    view_keys = {self.template.view_index_: [str(self.template)]}
+    columns = [None] * (len(self.sweep_slots) + len(self.expression_slots))
+    constants = []
+    views = [self.template]
+    while views:
+      view = views.pop(0)
+      names = view_names[view.view_index_]
+      keys = view_keys[view.view_index_]
+      overlaid = self.view_slots[view.view_index_]
+      for attr in view.attrs:
+        value = getattr(view, attr)
+        if attr in overlaid:
+          columns[overlaid[attr]] = {"name": ".".join(names + [attr]),
+                                     "keys": keys + [attr]}
+        elif isinstance(value, SweepableView):
+          view_names[value.view_index_] = names + [attr]
+          view_keys[value.view_index_] = keys + [str(value)]
+          views.append(value)
+        else:
+          constants.append({"name": ".".join(names + [attr]),
+                            "keys": keys + [attr],
+                            "type": type(value).__name__,
+                            "value": value})
+    for column, (_, _, _, param_range) in zip(columns, self.sweep_slots):
+      types = set(type(value).__name__ for value in param_range)
+      column["type"] = types.pop() if len(types) == 1 else "mixed"
+    for column in columns[len(self.sweep_slots):]:
+      column["type"] = "expression"
+    return {"columns": columns, "constants": constants}
+
+  def findViolatedConstraint(self, indices):
+    """ Check the config with these sweep range indices against the constraints.
+
+    Returns:
+      None if the config satisfies every constraint. Otherwise, the last param
+      position that the first violated constraint depends on, or -1 if it does
+      not depend on any param. Every config whose indices are the same up to
+      and including that position violates the same constraint.
+    """
+    if not self.constraint_fns:
+      return None
+    values = [param_range[indices[param_position]] for
+              _, _, param_position, param_range in self.sweep_slots]
+    values.extend(expression for _, _, expression in self.expression_slots)
+    self.evalExpressions_(indices, values, self.constraint_expression_slots)
+    for level, constraint_fn in zip(self.constraint_levels, self.constraint_fns):
+      if not constraint_fn(values):
+        return level
+    return None
+
+  def buildBatch(self, batch_indices):
+    """ Build the configs with these sweep range indices.
+
+    This produces the same configs as calling build() on each element of
+    batch_indices, but evaluates each expression only once for the whole
+    batch. Expressions that cannot be vectorized are evaluated one config at a
+    time, but only for configs whose inputs differ from the previous config.
+
+    Args:
+      batch_indices: A list of tuples of sweep range indices.
+
+    Returns:
+      A list of ConfigViews.
+    """
+    if len(batch_indices) == 0:
+      return []
+    if not self.expression_slots:
+      return [self.build(indices) for indices in batch_indices]
+    digits = np.array(batch_indices, dtype=np.int64).reshape(
+        len(batch_indices), self.num_params)
+    expression_results = self.evalExpressionsBatch(digits)
+    scalar_slots = [i for i, results in enumerate(expression_results) if results is None]
+    configs = []
+    previous = None
+    for i, indices in enumerate(batch_indices):
+      values = [param_range[indices[param_position]] for
+                _, _, param_position, param_range in self.sweep_slots]
+      values.extend(results[i] if results is not None else expression
+                    for results, (_, _, expression) in
+                    zip(expression_results, self.expression_slots))
+      if scalar_slots:
+        self.evalExpressions_(indices, values, scalar_slots, previous)
+        previous = (indices, values)
+      configs.append(ConfigView(self.template, self.view_slots, values))
+    return configs
+
+  def evalExpressionsBatch(self, digits):
+    """ Evaluate every expression slot over a batch of configs.
+
+    Args:
+      digits: A 2-D integer array whose rows are the sweep range indices of
+        each config in the batch.
+
+    Returns:
+      A list with one element per expression slot: either a list of the
+      values of that expression for each config, or None if the expression
+      could not be vectorized and has to be evaluated one config at a time.
+    """
+    batch_size = digits.shape[0]
+    columns = [param_array[digits[:, param_position]] for
+               (_, _, param_position, _), param_array in
+               zip(self.sweep_slots, self.sweep_slot_arrays)]
+    columns.extend(expression for _, _, expression in self.expression_slots)
+    first_expression_slot = len(self.sweep_slots)
+    # Params that take more than one value within this batch. An expression
+    # that does not depend on any of them has the same value for the whole
+    # batch, so it only has to be evaluated for the first config.
+    varying_params = frozenset(
+        position for position in range(self.num_params)
+        if digits[:, position].min() != digits[:, position].max())
+    first_columns = None
+    expression_results = []
+    for i, batch_expression_fn in enumerate(self.batch_expression_fns):
+      is_uniform = self.expression_deps[i].isdisjoint(varying_params)
+      if is_uniform and first_columns is None:
+        first_columns = [column[:1] if isinstance(column, np.ndarray) else column
+                         for column in columns]
+      try:
+        # Raise on division by zero, like scalar evaluation does.
+        with np.errstate(divide="raise", invalid="raise", over="ignore"):
+          if is_uniform:
+            result = batch_expression_fn(first_columns)
+          else:
+            result = batch_expression_fn(columns)
+          result = np.broadcast_to(result, (batch_size,))
+      except Exception:
+        # Leave the expression in place, so that anything that depends on it
+        # is not vectorized either.
+        expression_results.append(None)
+        continue
+      columns[first_expression_slot + i] = result
+      if first_columns is not None:
+        first_columns[first_expression_slot + i] = result[:1]
+      expression_results.append(result.tolist())
+    return expression_results
+
+def quoteSqliteName_(name):
+  return "\"" + name.replace("\"", "\"\"") + "\""
+
+def toSqliteValue_(value):
+  """ Convert a value of a config to a value that SQLite can store. """
+  if isinstance(value, np.ndarray):
+    return json.dumps(value.tolist())
+  elif isinstance(value, list):
+    return json.dumps(value)
+  return value
 
 class ConfigGenerator(base_generator.Generator):
-  def __init__(self, configured_sweep):
+  """ Expands a configured sweep into every combination of its swept parameters.
+
+  Configurations are ordered as the Cartesian product of the swept parameter
+  ranges, with parameters sorted by id and the last parameter varying fastest.
+  This makes every configuration addressable by a single integer index: the
+  index is a mixed-radix number whose digits are the positions within each
+  parameter's sweep range.
+
+  The generator can optionally produce only one shard of the sweep, so that
+  several processes or machines can each generate a disjoint part of it.
+  Together, the shards contain exactly the configs of the unsharded sweep,
+  each encoded identically.
+
+  Configs that violate a constraint of the sweep are skipped, but keep their
+  index, so config indices and shards are the same with or without
+  constraints. When a constraint only depends on the first few params, every
+  config that shares their values is skipped at once without being checked.
+  """
+  def __init__(self, configured_sweep, shard=None, shard_mode=SHARD_BLOCK, jobs=1,
+               output_format=FORMAT_JSON):
+    """ Construct a generator for a configured sweep.
+
+    Args:
+      configured_sweep: The BaseDesignSweep to expand.
+      shard: An optional (shard_index, num_shards) tuple. If specified, only
+        the configs of that shard are generated by run().
+      shard_mode: How configs are assigned to shards, either SHARD_BLOCK or
+        SHARD_STRIDE.
+      jobs: The number of processes that generate and encode configs.
+      output_format: The format of the output of run(), one of the keys of
+        OUTPUT_FORMATS.
+
+    Throws:
+      ValueError: if the output format, or the output compression or layout
+        of the sweep is unknown.
+    """
     self.sweep = configured_sweep
+    self.shard = shard
+    self.shard_mode = shard_mode
+    self.jobs = jobs
+    if output_format not in OUTPUT_FORMATS:
+      raise ValueError("Unknown output format %s." % output_format)
+    compression = configured_sweep.output_compression
+    if compression is not None and compression not in OUTPUT_COMPRESSIONS:
+      raise ValueError("Unknown output compression %s. Expected one of %s." %
+                       (compression, ", ".join(sorted(OUTPUT_COMPRESSIONS))))
+    layout = configured_sweep.output_layout
+    if layout is not None:
+      if layout not in (LAYOUT_HIVE, LAYOUT_BUCKETS):
+        raise ValueError("Unknown output layout %s. Expected %s or %s." %
+                         (layout, LAYOUT_HIVE, LAYOUT_BUCKETS))
+      if output_format != FORMAT_JSON:
+        raise ValueError("Per-config output files are only written as JSON.")
+    param_range_len = self.discoverSweptParameters()
+    # To preserve stability in sweep parameter ordering, first obtain the list
+    # of param ids, sort them, then get the appropriate index ranges. Splitting
+    # it up this way lets us achieve the same result as applying np.argsort()
+    # to both arrays without requiring numpy.
+    self.param_ids = sorted(param_range_len)
+    self.param_range_lens = [param_range_len[i] for i in self.param_ids]
+    # The place value of each digit of a config index.
+    self.param_strides = [1] * len(self.param_ids)
+    for i in reversed(range(len(self.param_ids) - 1)):
+      self.param_strides[i] = self.param_strides[i + 1] * self.param_range_lens[i + 1]
+    self.plan = SweepPlan(self.sweep, self.param_ids)
+    self.output_format = OUTPUT_FORMATS[output_format](self.plan)
 
   def run(self):
     """ Generate and dump output.
 
+    The configs are written to <sweep>.json, or <sweep>.jsonl for JSON Lines,
+    or <sweep>.csv for CSV. If this generator was constructed with a shard,
+    only that shard is generated, and it is written to
+    <sweep>.shard<i>of<N>.json (or .jsonl or .csv). If the sweep sets an
+    output_compression, the configs are compressed as they are written, and
+    the extension of the compression is appended, like <sweep>.json.gz. If the
+    output format has a schema, it is written uncompressed to
+    <sweep>.schema.json.
+
+    If the sweep sets an output_layout, each config is written to its own file
+    instead. See runPerConfigFiles_().
+
+    Unless the output is compressed, an offset index of the configs is also
+    written next to the output file, with the extension .idx appended, like
+    <sweep>.json.idx. It holds an INDEX_ENTRY for each config, so that
+    config_reader.ConfigReader can read any config by its config index
+    without reading the others.
+
     Returns the list of files generated.
     """
-    config_set = self.generate()
+    if self.sweep.output_layout is not None:
+      return self.runPerConfigFiles_()
+    config_indices, output_file_name = self.getRunOutput_(self.output_format.extension)
+    config_set = self.generate(config_indices)
     generated_files = []
-    if not os.path.exists(self.sweep.output_dir):
-      os.makedirs(self.sweep.output_dir)
-    output_file_name = os.path.join(self.sweep.output_dir, "%s.json" % self.sweep.name)
-    with open(output_file_name, "w") as f:
-      config_set.dump(f)
-      generated_files.append(output_file_name)
+    if self.output_format.has_schema:
+      schema_file_name = self.getOutputFileName(".schema.json")
+      with open(schema_file_name, "w") as f:
+        self.output_format.dumpSchema(f)
+        generated_files.append(schema_file_name)
+    output_file_name, f = self.openOutputFile_(output_file_name)
+    with f:
+      if self.sweep.output_compression is None:
+        index_file_name = output_file_name + ".idx"
+        with open(index_file_name, "wb") as index_f:
+          config_set.dump(f, index_f)
+        generated_files.extend([output_file_name, index_file_name])
+      else:
+        config_set.dump(f)
+        generated_files.append(output_file_name)
     return generated_files
 
-  def generate(self):
-    """ Generate all configurations of this sweep. """
-    param_range_len = self.discoverSweptParameters()
-    indices_list = []
-    id_list = []
-    # To preserve stability in sweep parameter ordering, first obtain the list
-    # of param ids, sort them, then get the appropriate index ranges. Splitting
-    # it up this way lets us achieve the same result as applying np.argsort()
-    # to both arrays without requiring numpy.
-    for param_id in param_range_len:
-      id_list.append(param_id)
-    id_list.sort()
-    for param_id in id_list:
-      indices_list.append(range(0, param_range_len[param_id]))
-    indices_list = tuple(indices_list)
-
-    # index_combinations is a generator of tuples, where the ith value is the
-    # index of the parameter range with parameter id id_list[i].
-    index_combinations = itertools.product(*indices_list)
-    generated_configs = []
-    for indices in index_combinations:
-      top_view = SweepableView(self.sweep)
-      self.applySweepParamValues(top_view, id_list, indices)
-      self.applyExpressionValues(top_view)
-      self.applyDefaultParamValues(top_view)
-      generated_configs.append(top_view)
-
-    return ConfigSet(generated_configs)
-
-  def applySweepParamValues(self, root_view, ids, indices):
-    """ Recursively apply the values of the swept parameter ranges. """
-    for param_id, param_idx in zip(ids, indices):
-      if param_id in root_view.sweepable.iterparamids():
-        param_value = root_view.sweepable.getSweepParamRange(param_id)[param_idx]
-        param_name = root_view.sweepable.getParamName(param_id)
-        setattr(root_view, param_name, param_value)
-
-    for child_view in root_view.iterattrvalues(objtype=SweepableView):
-      self.applySweepParamValues(child_view, ids, indices)
-
-  def applyDefaultParamValues(self, root_view):
-    """ Set any parameters untouched by 'set' or 'sweep' commands to default values. """
-    for attr in root_view.attrs:
-      if isinstance(getattr(root_view, attr), UnassignedParamValue):
-        setattr(root_view, attr, root_view.sweepable.getParamDefaultValue(attr))
-
-    for child_view in root_view.iterattrvalues(objtype=SweepableView):
-      self.applyDefaultParamValues(child_view)
-
-  def applyExpressionValues(self, root_view, parent_view=None):
-    """ Evaluate any expressions that could not be evaluated earlier.
-
-    Expressions that cannot be evaluated at command execution time are those
-    that:
-      - Reference an attribute that was marked to be swept.
-      - Reference an attribute that was left to its default value. Default
-        values are resolved at sweep generation time.
-    """
-    if parent_view == None:
-      parent_view = root_view
-    for attr in root_view.attrs:
-      attr_value = getattr(root_view, attr)
-      if isinstance(attr_value, Expression):
-        setattr(root_view, attr, attr_value.eval(parent_view))
-
-    for child_view in root_view.iterattrvalues(objtype=SweepableView):
-      self.applyExpressionValues(child_view, parent_view)
+  def openOutputFile_(self, file_name):
+    """ Open an output file for writing text, compressed if the sweep says so.
+
+    Returns:
+      A tuple of the name of the file, including the extension of the
+      compression, and the opened file.
+    """
+    compression = self.sweep.output_compression
+    if compression is None:
+      # The offset index counts UTF-8 bytes, and newlines are never translated.
+      return file_name, open(file_name, "w", encoding="utf-8", newline="")
+    extension, open_func, level_arg = OUTPUT_COMPRESSIONS[compression]
+    kwargs = {}
+    if self.sweep.output_compression_level is not None:
+      kwargs[level_arg] = self.sweep.output_compression_level
+    file_name += extension
+    return file_name, open_func(file_name, "wt", **kwargs)
+
+  def runSqlite(self):
+    """ Generate and write the configs to an SQLite database.
+
+    The database is written to <sweep>.sqlite, or <sweep>.shard<i>of<N>.sqlite
+    if this generator was constructed with a shard. An existing database is
+    replaced. Configs are generated by this process only, regardless of the
+    number of jobs.
+
+    The configs table has one row per config. Its config_index column is the
+    index of the config, and its primary key. Every other column holds the
+    values of one of the columns of the schema of the plan, named after it.
+    Lists are stored as JSON. If the output_sqlite_indexes attribute of the
+    sweep is set, swept columns are also indexed. The schema table describes
+    every attribute of a config, with the value of the attributes that are the
+    same in every config.
+
+    Rows are inserted in batches, with one transaction per batch.
+
+    Returns the list of files generated.
+
+    Throws:
+      ValueError: if an attribute of the configs is named config_index.
+    """
+    schema = self.plan.getSchema()
+    if any(column["name"] == SQLITE_CONFIG_INDEX for column in schema["columns"]):
+      raise ValueError("The attribute %s of sweep %s has the same name as the "
+                       "config index column of the SQLite output." %
+                       (SQLITE_CONFIG_INDEX, self.sweep.name))
+    config_indices, output_file_name = self.getRunOutput_(".sqlite")
+    if os.path.exists(output_file_name):
+      os.remove(output_file_name)
+    columns = [SQLITE_CONFIG_INDEX] + [column["name"] for column in schema["columns"]]
+    quoted_columns = [quoteSqliteName_(column) for column in columns]
+    column_types = ["INTEGER PRIMARY KEY"] + [
+        SQLITE_TYPES.get(column["type"], "") for column in schema["columns"]]
+    connection = sqlite3.connect(output_file_name)
+    try:
+      # The database is written from scratch, so it does not need to survive
+      # a crash halfway through.
+      connection.execute("PRAGMA journal_mode = OFF")
+      connection.execute("PRAGMA synchronous = OFF")
+      with connection:
+        connection.execute("CREATE TABLE schema (name TEXT PRIMARY KEY, "
+                           "keys TEXT, type TEXT, is_column INTEGER, value TEXT)")
+        connection.executemany(
+            "INSERT INTO schema VALUES (?, ?, ?, ?, ?)",
+            [(column["name"], json.dumps(column["keys"]), column["type"], 1, None)
+             for column in schema["columns"]] +
+            [(constant["name"], json.dumps(constant["keys"]), constant["type"], 0,
+              json.dumps(constant["value"])) for constant in schema["constants"]])
+        connection.execute("CREATE TABLE configs (%s)" % ", ".join(
+            ("%s %s" % column).strip() for column in zip(quoted_columns, column_types)))
+
+      insert = "INSERT INTO configs VALUES (%s)" % ", ".join("?" * len(columns))
+      for batch_indices, configs in self.iterbatches_(config_indices):
+        with connection:
+          connection.executemany(insert, (
+              [self.encodeConfigIndex(indices)] +
+              [toSqliteValue_(value) for value in config.values_]
+              for indices, config in zip(batch_indices, configs)))
+
+      # Indexes are faster to build once all rows are inserted.
+      if self.sweep.output_sqlite_indexes:
+        with connection:
+          for i, quoted_column in enumerate(quoted_columns[1:len(self.plan.sweep_slots) + 1]):
+            connection.execute("CREATE INDEX configs_index_%d ON configs (%s)" %
+                               (i, quoted_column))
+    finally:
+      connection.close()
+    return [output_file_name]
+
+  def runPerConfigFiles_(self):
+    """ Generate and write each config to its own file.
+
+    The files are written under <output_dir>/<sweep>/ in the layout named by
+    the output_layout attribute of the sweep:
+      - LAYOUT_HIVE: <param>=<value>/.../config.json, with one directory
+        level per swept parameter, in the order of the config indices. If a
+        parameter is swept on several objects, its value on the first one
+        names the directory. Values are escaped like URL components.
+      - LAYOUT_BUCKETS: <bucket>/<config index>.json, where each bucket
+        directory holds a block of output_bucket_size config indices.
+
+    Each file holds a single JSON object. Configs are generated and encoded
+    by this thread, and written by a pool of WRITE_THREADS threads, with at
+    most MAX_PENDING_WRITES encoded configs waiting to be written. If the
+    sweep sets an output_compression, each file is compressed.
+
+    Returns the list of files generated.
+    """
+    config_indices, output_dir = self.getRunOutput_("")
+    if self.sweep.output_layout == LAYOUT_HIVE:
+      # The name and the sweep range of each param position.
+      hive_levels = [None] * len(self.param_ids)
+      for _, attr, param_position, param_range in self.plan.sweep_slots:
+        if hive_levels[param_position] is None:
+          hive_levels[param_position] = (attr, param_range)
+      def getConfigPath(indices):
+        return os.path.join(*(
+            ["%s=%s" % (attr, urllib.parse.quote(str(param_range[index]), safe=""))
+             for (attr, param_range), index in zip(hive_levels, indices)] +
+            ["config.json"]))
+    else:
+      bucket_size = self.sweep.output_bucket_size or DEFAULT_BUCKET_SIZE
+      def getConfigPath(indices):
+        config_index = self.encodeConfigIndex(indices)
+        return os.path.join(str(config_index // bucket_size), "%d.json" % config_index)
+
+    generated_files = []
+    executor = concurrent.futures.ThreadPoolExecutor(WRITE_THREADS)
+    try:
+      pending = collections.deque()
+      for batch_indices, configs in self.iterbatches_(config_indices):
+        for indices, config in zip(batch_indices, configs):
+          file_name = os.path.join(output_dir, getConfigPath(indices))
+          encoded = json.dumps(config.dictify(), sort_keys=True, indent=2)
+          pending.append(executor.submit(self.writeConfigFile_, file_name, encoded))
+          if len(pending) >= MAX_PENDING_WRITES:
+            generated_files.append(pending.popleft().result())
+      while pending:
+        generated_files.append(pending.popleft().result())
+    finally:
+      executor.shutdown()
+    return generated_files
+
+  def writeConfigFile_(self, file_name, encoded):
+    """ Write an encoded config to file_name and return the name of the file. """
+    directory = os.path.dirname(file_name)
+    if not os.path.isdir(directory):
+      try:
+        os.makedirs(directory)
+      except OSError:
+        # Another thread may have created it first.
+        if not os.path.isdir(directory):
+          raise
+    file_name, f = self.openOutputFile_(file_name)
+    with f:
+      f.write(encoded)
+    return file_name
+
+  def getRunOutput_(self, extension):
+    """ Return the config indices and the output file name of a run.
+
+    The config indices are None unless this generator was constructed with a
+    shard, in which case they are the indices of that shard.
+    """
+    if self.shard is None:
+      return None, self.getOutputFileName(extension)
+    shard_index, num_shards = self.shard
+    return (self.getShardIndices(shard_index, num_shards),
+            self.getOutputFileName(".shard%dof%d%s" % (shard_index, num_shards, extension)))
+
+  def runConfig(self, config_index):
+    """ Generate and dump only the config at config_index.
+
+    The config is written as a single JSON object to <sweep>.<index>.json.
+
+    Returns the list of files generated.
+
+    Throws:
+      XenonConfigIndexError: see generateConfig().
+    """
+    config = self.generateConfig(config_index)
+    output_file_name = self.getOutputFileName(".%d.json" % config_index)
+    with open(output_file_name, "w") as f:
+      config.dump(f)
+    return [output_file_name]
+
+  def getOutputFileName(self, suffix):
+    """ Return the path of an output file of this sweep with the given suffix.
+
+    The output directory is created if it does not exist.
+    """
+    if self.sweep.output_dir and not os.path.exists(self.sweep.output_dir):
+      os.makedirs(self.sweep.output_dir)
+    return os.path.join(self.sweep.output_dir, self.sweep.name + suffix)
+
+  def generate(self, config_indices=None):
+    """ Return a ConfigSet over configurations of this sweep.
+
+    Configurations are generated lazily as the ConfigSet is dumped. If this
+    generator has more than one job, they are generated in parallel.
+
+    Args:
+      config_indices: An optional iterable of config indices to generate, in
+        order. By default, every config of the sweep is generated. With more
+        than one job, this must be a sequence, like a range.
+    """
+    if self.jobs > 1:
+      if config_indices is None:
+        config_indices = range(self.getNumConfigs())
+      return ParallelConfigSet(self, config_indices, self.jobs)
+    # The configs and their indices are consumed in lockstep, so the tee
+    # never holds more than one of them.
+    indexed_configs, indexed_configs_copy = itertools.tee(
+        self.iterindexedconfigs_(config_indices))
+    return ConfigSet((config for _, config in indexed_configs), self.output_format,
+                     (config_index for config_index, _ in indexed_configs_copy))
+
+  def iterconfigs(self, config_indices=None):
+    """ Generator over configurations of this sweep, one at a time.
+
+    Args:
+      config_indices: An optional iterable of config indices to generate, in
+        order. By default, every config of the sweep is generated.
+    """
+    for _, configs in self.iterbatches_(config_indices):
+      for config in configs:
+        yield config
+
+  def iterindexedconfigs_(self, config_indices=None):
+    """ Generator over (config index, config) tuples of this sweep.
+
+    Args:
+      config_indices: See iterconfigs(). With constraints, the configs that
+        violate them are skipped, so the config indices are not necessarily
+        contiguous.
+    """
+    for batch_indices, configs in self.iterbatches_(config_indices):
+      for indices, config in zip(batch_indices, configs):
+        yield self.encodeConfigIndex(indices), config
+
+  def iterbatches_(self, config_indices=None):
+    """ Generator over batches of configurations of this sweep.
+
+    Configs are built in batches so that their expressions can be evaluated
+    together.
+
+    Args:
+      config_indices: See iterconfigs().
+
+    Returns:
+      A generator of (batch_indices, configs) tuples, where batch_indices is a
+      list of tuples of sweep range indices and configs is the list of
+      corresponding configs.
+    """
+    if self.plan.constraints:
+      if config_indices is None:
+        config_indices = range(self.getNumConfigs())
+      index_combinations = self.itervalidindices_(config_indices)
+    elif config_indices is None:
+      # index_combinations is a generator of tuples, where the ith value is the
+      # index of the parameter range with parameter id param_ids[i].
+      index_combinations = itertools.product(
+          *[range(0, range_len) for range_len in self.param_range_lens])
+    else:
+      index_combinations = (self.decodeConfigIndex(config_index)
+                            for config_index in config_indices)
+    while True:
+      batch_indices = list(itertools.islice(index_combinations, BATCH_SIZE))
+      if not batch_indices:
+        break
+      yield batch_indices, self.plan.buildBatch(batch_indices)
+
+  def itervalidindices_(self, config_indices):
+    """ Generator over the indices of the configs that satisfy the constraints.
+
+    Args:
+      config_indices: An iterable of config indices to check, in order. If it
+        is a contiguous range, configs that are known to violate a constraint
+        are skipped without being checked.
+    """
+    if not isinstance(config_indices, range) or config_indices.step != 1:
+      for config_index in config_indices:
+        indices = self.decodeConfigIndex(config_index)
+        if self.plan.findViolatedConstraint(indices) is None:
+          yield indices
+      return
+    config_index = config_indices.start
+    while config_index < config_indices.stop:
+      indices = self.decodeConfigIndex(config_index)
+      level = self.plan.findViolatedConstraint(indices)
+      if level is None:
+        yield indices
+        config_index += 1
+      elif level < 0:
+        # The constraint does not depend on any param, so no config satisfies it.
+        return
+      else:
+        # Skip to the next config whose indices differ up to this level.
+        stride = self.param_strides[level]
+        config_index = (config_index // stride + 1) * stride
+
+  def generateConfig(self, config_index):
+    """ Generate only the config at config_index, without expanding the sweep.
+
+    Throws:
+      XenonConfigIndexRangeError: if config_index does not refer to a config
+        of this sweep.
+      XenonExcludedConfigError: if the config does not satisfy the
+        constraints of the sweep.
+    """
+    indices = self.decodeConfigIndex(config_index)
+    if self.plan.findViolatedConstraint(indices) is not None:
+      raise xe.XenonExcludedConfigError("Config %d of sweep %s does not satisfy its constraints." %
+                       (config_index, self.sweep.name))
+    return self.buildConfig_(indices)
+
+  def buildConfig_(self, indices):
+    return self.plan.build(indices)
+
+  def getShardIndices(self, shard_index, num_shards):
+    """ Return the range of config indices that belong to a shard.
+
+    Throws:
+      ValueError: if the shard or the shard mode is invalid.
+    """
+    if num_shards < 1 or shard_index < 0 or shard_index >= num_shards:
+      raise ValueError("Invalid shard %d of %d." % (shard_index, num_shards))
+    num_configs = self.getNumConfigs()
+    if self.shard_mode == SHARD_BLOCK:
+      return range(shard_index * num_configs // num_shards,
+                   (shard_index + 1) * num_configs // num_shards)
+    elif self.shard_mode == SHARD_STRIDE:
+      return range(shard_index, num_configs, num_shards)
+    raise ValueError("Unknown shard mode %s." % self.shard_mode)
+
+  def estimate(self, num_samples=ESTIMATE_SAMPLES):
+    """ Project the cost of generating this sweep without generating it.
+
+    The number of configs that satisfy the constraints is counted exactly,
+    but only up to num_samples configs, spread evenly across the sweep, are
+    generated and encoded. The JSON size and the generation time of the whole
+    sweep are extrapolated from these samples.
+
+    Returns:
+      A SweepEstimate. json_size is in bytes and generation_time is in seconds
+      for a single job.
+    """
+    num_configs = self.getNumConfigs()
+    if self.plan.constraints:
+      num_valid_configs = sum(1 for _ in self.itervalidindices_(range(num_configs)))
+    else:
+      num_valid_configs = num_configs
+    if num_valid_configs == 0:
+      return SweepEstimate(num_configs, 0, 0, len(self.output_format.empty), 0.0)
+    num_samples = min(num_samples, num_valid_configs)
+    # The positions of the samples among the configs that are generated.
+    sample_positions = set(i * num_valid_configs // num_samples for i in range(num_samples))
+    if self.plan.constraints:
+      sample_indices = [indices for position, indices in
+                        enumerate(self.itervalidindices_(range(num_configs)))
+                        if position in sample_positions]
+    else:
+      sample_indices = [self.decodeConfigIndex(position) for
+                        position in sorted(sample_positions)]
+
+    start = time.time()
+    output_format = self.output_format
+    encoded_size = sum(len(output_format.encode(config)) for
+                       config in self.plan.buildBatch(sample_indices))
+    elapsed = time.time() - start
+
+    json_size = (encoded_size * num_valid_configs // num_samples +
+                 len(output_format.separator) * (num_valid_configs - 1) +
+                 len(output_format.prefix) + len(output_format.suffix))
+    generation_time = elapsed * num_valid_configs / num_samples
+    return SweepEstimate(num_configs, num_valid_configs, num_samples,
+                         json_size, generation_time)
+
+  def getNumConfigs(self):
+    """ Return the total number of configurations in this sweep.
+
+    This is the size of the product of the sweep ranges, including configs
+    that violate a constraint.
+    """
+    num_configs = 1
+    for range_len in self.param_range_lens:
+      num_configs *= range_len
+    return num_configs
+
+  def decodeConfigIndex(self, config_index):
+    """ Convert a config index into a tuple of sweep range indices.
+
+    The ith element of the tuple is the position within the sweep range of the
+    parameter with id param_ids[i].
+
+    Throws:
+      XenonConfigIndexRangeError: if config_index does not refer to a config
+        of this sweep.
+    """
+    if config_index < 0 or config_index >= self.getNumConfigs():
+      raise xe.XenonConfigIndexRangeError("Config index %d is out of range for sweep %s with %d configs." %
+                       (config_index, self.sweep.name, self.getNumConfigs()))
+    return tuple((config_index // stride) % range_len for stride, range_len in
+                 zip(self.param_strides, self.param_range_lens))
+
+  def encodeConfigIndex(self, indices):
+    """ Convert sweep range indices back into a config index.
+
+    Args:
+      indices: Either a sequence of sweep range indices ordered like
+        param_ids, or a dict mapping each swept param id to its sweep range
+        index.
+
+    Throws:
+      IndexError: if any range index is out of range for its parameter.
+      KeyError: if indices is a dict that is missing a swept param id.
+    """
+    if isinstance(indices, dict):
+      indices = [indices[param_id] for param_id in self.param_ids]
+    if len(indices) != len(self.param_ids):
+      raise IndexError("Expected %d sweep range indices, got %d." %
+                       (len(self.param_ids), len(indices)))
+    config_index = 0
+    for param_id, idx, stride, range_len in zip(
+        self.param_ids, indices, self.param_strides, self.param_range_lens):
+      if idx < 0 or idx >= range_len:
+        raise IndexError("Index %d is out of range for parameter id %d with %d values." %
+                         (idx, param_id, range_len))
+      config_index += idx * stride
+    return config_index
 
   def discoverSweptParameters(self):
     """ Return a list of all swept Param objects.
@@ -1,34 +1,56 @@
 # End-to-end tests.
 
+import csv
+import gzip
+import io
 import json
 import os
 import shutil
+import sqlite3
 import unittest
+import unittest.mock as mock
 
+from xenon.generators.exhaustive_configs import ConfigGenerator
 from xenon.xenon_interpreter import XenonInterpreter
 
 TEST_DIR = "tests/test_sweeps"
 EXPECTED_OUTPUT_DIR = os.path.join(TEST_DIR, "expected_output")
 
 class Common(object):
-  class CompleteSweepTest(unittest.TestCase):
-    def runTest(self):
+  class GeneratedFilesTest(unittest.TestCase):
+    """ A test that runs Xenon files and removes the files they generate. """
+    def setUp(self):
       self.genfiles = []
-      interpreter = XenonInterpreter(os.path.join(TEST_DIR, self.testcase))
-      self.genfiles = interpreter.run()
 
-      expected_fname = os.path.join(EXPECTED_OUTPUT_DIR, os.path.basename(self.genfiles[0]))
-      with open(expected_fname, "r") as e:
-        expected = json.load(e)
-      with open(self.genfiles[0], "r") as o:
-        output = json.load(o)
-      self.assertEqual(expected, output)
+    def runXenonFile(self, testcase, **run_options):
+      """ Run a Xenon file from TEST_DIR and return the files it generated.
+
+      run_options are passed to XenonInterpreter.run().
+      """
+      interpreter = XenonInterpreter(os.path.join(TEST_DIR, testcase))
+      genfiles = interpreter.run(**run_options)
+      self.genfiles.extend(genfiles)
+      return genfiles
+
+    def loadExpectedOutput(self, name="single.json"):
+      with open(os.path.join(EXPECTED_OUTPUT_DIR, name), "r") as e:
+        return json.load(e)
 
     def tearDown(self):
       if len(self.genfiles):
         output_dir = os.path.dirname(self.genfiles[0])
         shutil.rmtree(output_dir)
 
+  class CompleteSweepTest(GeneratedFilesTest):
+    def runTest(self):
+      self.genfiles = []
+      genfiles = self.runXenonFile(self.testcase)
+
+      expected = self.loadExpectedOutput(os.path.basename(genfiles[0]))
+      with open(genfiles[0], "r") as o:
+        output = json.load(o)
+      self.assertEqual(expected, output)
+
 class SimpleSweepParam(Common.CompleteSweepTest):
   def setUp(self):
     self.testcase = "single_sweep_param.xe"
@@ -65,5 +87,122 @@ class MultiUseCommands(Common.CompleteSweepTest):
   def setUp(self):
     self.testcase = "multi_use_commands.xe"
 
+class SingleConfigIndex(Common.GeneratedFilesTest):
+  def runTest(self):
+    genfiles = self.runXenonFile("single_sweep_param.xe", config_index=3)
+    self.assertEqual(os.path.basename(genfiles[0]), "single.3.json")
+    with open(genfiles[0], "r") as o:
+      output = json.load(o)
+    self.assertEqual(self.loadExpectedOutput()[3], output)
+
+class ExcludedConfigIndex(unittest.TestCase):
+  def runTest(self):
+    # Config 2 has cycle_time 3, which the constraint excludes.
+    # There is no config 5.
+    for config_index, error in [
+        (2, "XenonExcludedConfigError: Config 2 of sweep single"),
+        (5, "XenonConfigIndexRangeError: Config index 5 is out of range")]:
+      interpreter = XenonInterpreter(os.path.join(TEST_DIR, "require_constraint.xe"))
+      with mock.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+        self.assertRaises(SystemExit, interpreter.run, config_index=config_index)
+      self.assertTrue(stderr.getvalue().startswith("Error occurred in generating single\n"))
+      self.assertIn(error, stderr.getvalue())
+    self.assertFalse(os.path.exists("tmp"))
+
+    # Other errors are not reported as invalid config indices.
+    interpreter = XenonInterpreter(os.path.join(TEST_DIR, "require_constraint.xe"))
+    with mock.patch.object(ConfigGenerator, "runConfig", side_effect=ValueError("unrelated")):
+      self.assertRaises(ValueError, interpreter.run, config_index=0)
+
+class ShardedSweep(Common.GeneratedFilesTest):
+  def runTest(self):
+    output = []
+    for shard_index in range(3):
+      genfiles = self.runXenonFile("single_sweep_param.xe", shard=(shard_index, 3))
+      self.assertEqual(os.path.basename(genfiles[0]), "single.shard%dof3.json" % shard_index)
+      with open(genfiles[0], "r") as o:
+        output.extend(json.load(o))
+    self.assertEqual(self.loadExpectedOutput(), output)
+
+class ListSweepParam(Common.GeneratedFilesTest):
+  def runTest(self):
+    # Sweeping over a list gives the same configs as the equivalent range.
+    genfiles = self.runXenonFile("list_sweep_param.xe")
+    with open(genfiles[0], "r") as o:
+      output = json.load(o)
+    self.assertEqual(self.loadExpectedOutput(), output)
+
+class RequireConstraint(Common.GeneratedFilesTest):
+  def runTest(self):
+    genfiles = self.runXenonFile("require_constraint.xe")
+    with open(genfiles[0], "r") as o:
+      output = json.load(o)
+    expected = self.loadExpectedOutput()
+    self.assertEqual([expected[i] for i in [0, 1, 3, 4]], output)
+
+class JsonLinesOutput(Common.GeneratedFilesTest):
+  def runTest(self):
+    genfiles = self.runXenonFile("jsonl_output.xe")
+    self.assertEqual(os.path.basename(genfiles[0]), "single.jsonl")
+    with open(genfiles[0], "r") as o:
+      output = [json.loads(line) for line in o]
+    self.assertEqual(self.loadExpectedOutput(), output)
+
+class CsvOutput(Common.GeneratedFilesTest):
+  def runTest(self):
+    genfiles = self.runXenonFile("csv_output.xe")
+    self.assertEqual([os.path.basename(f) for f in genfiles],
+                     ["single.schema.json", "single.csv", "single.csv.idx"])
+
+    with open(genfiles[0], "r") as s:
+      schema = json.load(s)
+    with open(genfiles[1], "r") as o:
+      rows = list(csv.reader(o))
+    self.assertEqual(rows[0], [column["name"] for column in schema["columns"]])
+    cycle_time = rows[0].index("aes_aes.cycle_time")
+    self.assertEqual([row[cycle_time] for row in rows[1:]], ["1", "2", "3", "4", "5"])
+    self.assertIn("ExhaustiveSweep(\"single\")", schema["constants"][0]["keys"])
+
+class SqliteOutput(Common.GeneratedFilesTest):
+  def runTest(self):
+    genfiles = self.runXenonFile("sqlite_output.xe")
+    self.assertEqual(os.path.basename(genfiles[0]), "single.sqlite")
+
+    connection = sqlite3.connect(genfiles[0])
+    try:
+      rows = connection.execute('SELECT "aes_aes.cycle_time" FROM configs '
+                                'ORDER BY config_index').fetchall()
+    finally:
+      connection.close()
+    self.assertEqual(rows, [(1,), (2,), (3,), (4,), (5,)])
+
+class CompressedOutput(Common.GeneratedFilesTest):
+  def runTest(self):
+    genfiles = self.runXenonFile("compressed_output.xe")
+    self.assertEqual(os.path.basename(genfiles[0]), "single.json.gz")
+
+    expected = self.loadExpectedOutput()
+    with gzip.open(genfiles[0], "rt") as o:
+      output = json.load(o)
+    self.assertEqual(len(expected), len(output))
+    for expected_config, output_config in zip(expected, output):
+      sweep = output_config['ExhaustiveSweep("single")']
+      self.assertEqual(sweep.pop("output_compression"), "gzip")
+      self.assertEqual(sweep.pop("output_compression_level"), 6)
+      self.assertEqual(expected_config, output_config)
+
+class EstimateSweep(unittest.TestCase):
+  def runTest(self):
+    interpreter = XenonInterpreter(os.path.join(TEST_DIR, "require_constraint.xe"))
+    interpreter.parse()
+    interpreter.execute()
+    report = io.StringIO()
+    estimates = interpreter.estimate_outputs(report)
+    self.assertEqual(estimates["single"].num_configs, 5)
+    self.assertEqual(estimates["single"].num_valid_configs, 4)
+    self.assertIn("Configs satisfying constraints: 4", report.getvalue())
+    # Nothing is generated.
+    self.assertFalse(os.path.exists("tmp"))
+
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,106 @@
+# Unit tests for random access to generated configs.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from xenon.base.expressions import ParseExpression
+from xenon.base.keywords import *
+from xenon.generators.config_reader import ConfigReader
+from xenon.generators.exhaustive_configs import *
+
+from xenon.tests import test_module
+
+class ConfigReaderTestCase(unittest.TestCase):
+  def setUp(self):
+    self.sweep = test_module.createFakeSweepEnviron()
+    self.sweep.top1.setSweepParameter("int_param", 1, 3, 1, KW_LINSTEP)
+    self.sweep.top1.setSweepParameter("inner0_param", 1, 8, 2, KW_EXPSTEP)
+    self.sweep.top1.middle2.int_param = ParseExpression("top1.int_param * 2")
+    self.sweep.output_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.sweep.output_dir)
+
+  def getExpectedConfigs(self):
+    return [config.dictify() for config in ConfigGenerator(self.sweep).iterconfigs()]
+
+  def runGenerator(self, **generator_options):
+    genfiles = ConfigGenerator(self.sweep, **generator_options).run()
+    self.assertTrue(genfiles[-1].endswith(".idx"))
+    return genfiles[-2]
+
+  def test_formats(self):
+    expected = self.getExpectedConfigs()
+    for output_format in [FORMAT_JSON, FORMAT_JSONL, FORMAT_CSV]:
+      with ConfigReader(self.runGenerator(output_format=output_format)) as reader:
+        self.assertEqual(len(reader), 12)
+        self.assertEqual(reader[5], expected[5])
+        self.assertEqual(reader[11], expected[11])
+        self.assertEqual(list(reader), expected)
+
+  def test_out_of_range(self):
+    with ConfigReader(self.runGenerator()) as reader:
+      self.assertEqual(reader.first_config_index_, 0)
+      self.assertRaises(IndexError, reader.__getitem__, 12)
+      self.assertRaises(IndexError, reader.__getitem__, -1)
+
+  def test_special_characters(self):
+    self.sweep.top1.middle1.setSweepParameterList(
+        "str_param", [u"café", "a,b", "two\nlines", 'say "hi"'])
+    expected = self.getExpectedConfigs()
+    for output_format in [FORMAT_JSON, FORMAT_JSONL, FORMAT_CSV]:
+      with ConfigReader(self.runGenerator(output_format=output_format)) as reader:
+        self.assertEqual(list(reader), expected)
+
+  def test_parallel(self):
+    expected = self.getExpectedConfigs()
+    with ConfigReader(self.runGenerator(jobs=2)) as reader:
+      self.assertEqual(list(reader), expected)
+
+  def test_shard(self):
+    expected = self.getExpectedConfigs()
+    file_name = self.runGenerator(output_format=FORMAT_CSV, shard=(1, 2))
+    with ConfigReader(file_name) as reader:
+      self.assertEqual(list(reader), expected[6:])
+      self.assertEqual(reader[6], expected[6])
+      self.assertEqual(reader.first_config_index_, 6)
+      self.assertNotIn(0, reader)
+      self.assertRaises(IndexError, reader.__getitem__, 0)
+
+  def test_constraints(self):
+    # Configs are looked up by config index, like --config-index, rather than
+    # by position in the file.
+    self.sweep.addConstraint(ParseExpression("top1.int_param != 2"))
+    generator = ConfigGenerator(self.sweep)
+    expected = {}
+    for config_index in range(generator.getNumConfigs()):
+      try:
+        expected[config_index] = generator.generateConfig(config_index).dictify()
+      except ValueError:
+        pass
+    self.assertEqual(len(expected), 8)
+    for generator_options, config_indices in [({}, range(12)),
+                                              ({"jobs": 2}, range(12)),
+                                              ({"shard": (1, 2)}, range(6, 12))]:
+      valid_indices = [k for k in config_indices if k in expected]
+      with ConfigReader(self.runGenerator(**generator_options)) as reader:
+        self.assertEqual(list(reader.config_indices), valid_indices)
+        is_contiguous = valid_indices == list(range(valid_indices[0], valid_indices[-1] + 1))
+        self.assertEqual(reader.first_config_index_ is not None, is_contiguous)
+        for config_index in range(12):
+          if config_index in valid_indices:
+            self.assertEqual(reader[config_index], expected[config_index])
+          else:
+            self.assertRaises(IndexError, reader.__getitem__, config_index)
+
+  def test_empty(self):
+    self.sweep.addConstraint(ParseExpression("top1.int_param > 3"))
+    for output_format in [FORMAT_JSON, FORMAT_JSONL, FORMAT_CSV]:
+      with ConfigReader(self.runGenerator(output_format=output_format)) as reader:
+        self.assertEqual(len(reader), 0)
+        self.assertRaises(IndexError, reader.__getitem__, 0)
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,653 @@
+# Unit tests for the exhaustive configuration generator.
+
+import bz2
+import csv
+import gzip
+import io
+import itertools
+import json
+import lzma
+import numpy as np
+import operator
+import os
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import types
+import unittest
+
+from xenon.base.exceptions import XenonSelectionError
+from xenon.base.expressions import FoldedConstant, ParseExpression
+from xenon.base.keywords import *
+from xenon.generators.exhaustive_configs import *
+
+from xenon.tests import test_module
+
+class GeneratorTestCase(unittest.TestCase):
+  def setUp(self):
+    self.sweep = test_module.createFakeSweepEnviron()
+    self.sweep.top1.setSweepParameter("int_param", 1, 3, 1, KW_LINSTEP)
+    self.sweep.top1.setSweepParameter("inner0_param", 1, 8, 2, KW_EXPSTEP)
+    self.generator = ConfigGenerator(self.sweep)
+
+  def dumpToString(self, config_set):
+    stream = io.StringIO()
+    config_set.dump(stream)
+    return stream.getvalue()
+
+class StreamingGeneration(GeneratorTestCase):
+  def test_configs_are_lazy(self):
+    config_set = self.generator.generate()
+    self.assertIsInstance(config_set.configs, types.GeneratorType)
+
+  def test_dump_matches_json_dump(self):
+    output = self.dumpToString(self.generator.generate())
+    configs = [c.dictify() for c in self.generator.iterconfigs()]
+    self.assertEqual(len(configs), 12)
+    self.assertEqual(output, json.dumps(configs, sort_keys=True, indent=2))
+
+  def test_empty_config_set(self):
+    output = self.dumpToString(ConfigSet(iter([])))
+    self.assertEqual(output, json.dumps([], sort_keys=True, indent=2))
+    self.assertEqual(json.loads(output), [])
+
+class JsonLinesOutput(GeneratorTestCase):
+  def test_one_config_per_line(self):
+    expected = json.loads(self.dumpToString(self.generator.generate()))
+    generator = ConfigGenerator(self.sweep, output_format=FORMAT_JSONL)
+    output = self.dumpToString(generator.generate())
+    self.assertTrue(output.endswith("}\n"))
+    lines = output.splitlines()
+    self.assertEqual([json.loads(line) for line in lines], expected)
+    self.assertEqual(lines[0], json.dumps(expected[0], sort_keys=True, separators=(",", ":")))
+
+  def test_parallel(self):
+    generator = ConfigGenerator(self.sweep, output_format=FORMAT_JSONL)
+    expected = self.dumpToString(generator.generate())
+    generator = ConfigGenerator(self.sweep, output_format=FORMAT_JSONL, jobs=2)
+    self.assertEqual(self.dumpToString(generator.generate()), expected)
+
+  def test_empty(self):
+    self.assertEqual(self.dumpToString(ConfigSet(iter([]), JsonLinesFormat)), "")
+
+  def test_unknown_format(self):
+    self.assertRaises(ValueError, ConfigGenerator, self.sweep, output_format="xml")
+
+class CsvOutput(GeneratorTestCase):
+  def loadConfigs(self, schema, output):
+    """ Rebuild the JSON configs from the schema and the CSV rows. """
+    rows = list(csv.reader(io.StringIO(output)))
+    self.assertEqual(rows[0], [column["name"] for column in schema["columns"]])
+    configs = []
+    for row in rows[1:]:
+      config = {}
+      def setValue(keys, value):
+        obj = config
+        for key in keys[:-1]:
+          obj = obj.setdefault(key, {})
+        obj[keys[-1]] = value
+      for constant in schema["constants"]:
+        setValue(constant["keys"], constant["value"])
+      for column, cell in zip(schema["columns"], row):
+        setValue(column["keys"], cell if column["type"] == "str" else json.loads(cell))
+      configs.append(config)
+    return configs
+
+  def checkMatchesJson(self):
+    expected = json.loads(self.dumpToString(self.generator.generate()))
+    generator = ConfigGenerator(self.sweep, output_format=FORMAT_CSV)
+    schema = json.loads(json.dumps(generator.output_format.schema))
+    output = self.dumpToString(generator.generate())
+    self.assertEqual(self.loadConfigs(schema, output), expected)
+    return schema, output
+
+  def test_schema(self):
+    self.sweep.top1.middle1.int_param = ParseExpression("top1.int_param * 2")
+    self.generator = ConfigGenerator(self.sweep)
+    schema, output = self.checkMatchesJson()
+    self.assertEqual([(c["name"], c["type"]) for c in schema["columns"]],
+                     [("top1.int_param", "int"), ("top1.inner0_param", "int"),
+                      ("top1.middle1.int_param", "expression")])
+    self.assertEqual(schema["columns"][2]["keys"],
+                     ['FakeDesignSweep("mysweep")', 'FakeSweepable("top1")',
+                      'FakeSweepable("middle1")', "int_param"])
+    self.assertEqual(output.splitlines()[1], "1,1,2.0")
+    self.assertIn({"name": "top1.middle2.low0", "type": "str",
+                   "keys": ['FakeDesignSweep("mysweep")', 'FakeSweepable("top1")',
+                            'FakeSweepable("middle2")', "low0"],
+                   "value": "a second low value"}, schema["constants"])
+
+  def test_quoting(self):
+    self.sweep.top1.middle2.setSweepParameterList("str_param", ["a,b", 'say "hi"', "c"])
+    self.generator = ConfigGenerator(self.sweep)
+    self.checkMatchesJson()
+
+  def test_empty(self):
+    self.sweep.addConstraint(ParseExpression("top1.int_param > 3"))
+    generator = ConfigGenerator(self.sweep, output_format=FORMAT_CSV)
+    self.assertEqual(self.dumpToString(generator.generate()),
+                     "top1.int_param,top1.inner0_param\n")
+
+class SqliteOutput(GeneratorTestCase):
+  def setUp(self):
+    super(SqliteOutput, self).setUp()
+    self.sweep.output_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.sweep.output_dir)
+
+  def query(self, file_name, sql):
+    connection = sqlite3.connect(file_name)
+    try:
+      return connection.execute(sql).fetchall()
+    finally:
+      connection.close()
+
+  def getIndexes(self, file_name):
+    return self.query(file_name, "SELECT sql FROM sqlite_master "
+                      "WHERE tbl_name = 'configs' AND type = 'index'")
+
+  def test_rows(self):
+    self.sweep.top1.middle1.int_param = ParseExpression("top1.int_param * 2")
+    self.sweep.addConstraint(ParseExpression("top1.inner0_param != 2"))
+    generator = ConfigGenerator(self.sweep)
+    file_name, = generator.runSqlite()
+    self.assertEqual(os.path.basename(file_name), "mysweep.sqlite")
+    rows = self.query(file_name, "SELECT * FROM configs ORDER BY config_index")
+    self.assertEqual(len(rows), 9)
+    self.assertEqual(rows[:3], [(0, 1, 1, 2.0), (2, 1, 4, 2.0), (3, 1, 8, 2.0)])
+    self.assertEqual(
+        self.query(file_name, 'SELECT config_index FROM configs WHERE '
+                   '"top1.int_param" = 3 AND "top1.inner0_param" > 2'), [(10,), (11,)])
+
+  def test_schema_and_indexes(self):
+    file_name, = ConfigGenerator(self.sweep).runSqlite()
+    columns = self.query(file_name, "SELECT name, type FROM schema WHERE is_column = 1")
+    self.assertEqual(sorted(columns), [("top1.inner0_param", "int"), ("top1.int_param", "int")])
+    self.assertEqual(self.query(file_name, "SELECT value FROM schema WHERE name = 'top1.middle0'"),
+                     [('"a middle value"',)])
+    # The table is keyed by config_index, and swept columns are not indexed
+    # unless requested.
+    self.assertEqual(self.getIndexes(file_name), [])
+    self.sweep.output_sqlite_indexes = True
+    file_name, = ConfigGenerator(self.sweep).runSqlite()
+    self.assertEqual(len(self.getIndexes(file_name)), 2)
+
+  def test_config_index_attribute(self):
+    config_index = IntParam("config_index", 0)
+    self.sweep.addSweepableParam(config_index)
+    self.sweep.config_index = ParseExpression("top1.int_param * 2")
+    self.assertRaises(ValueError, ConfigGenerator(self.sweep).runSqlite)
+    self.assertEqual(os.listdir(self.sweep.output_dir), [])
+
+  def test_replaces_existing_database(self):
+    ConfigGenerator(self.sweep).runSqlite()
+    file_name, = ConfigGenerator(self.sweep).runSqlite()
+    self.assertEqual(self.query(file_name, "SELECT COUNT(*) FROM configs"), [(12,)])
+
+  def test_shard(self):
+    generator = ConfigGenerator(self.sweep, shard=(1, 2))
+    file_name, = generator.runSqlite()
+    self.assertEqual(os.path.basename(file_name), "mysweep.shard1of2.sqlite")
+    self.assertEqual(self.query(file_name, "SELECT config_index FROM configs ORDER BY config_index"),
+                     [(i,) for i in range(6, 12)])
+
+class CompressedOutput(GeneratorTestCase):
+  def setUp(self):
+    super(CompressedOutput, self).setUp()
+    self.sweep.output_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.sweep.output_dir)
+
+  def test_compressions(self):
+    file_name, _ = ConfigGenerator(self.sweep, output_format=FORMAT_JSONL).run()
+    with open(file_name) as f:
+      expected = [json.loads(line) for line in f]
+    self.sweep.output_compression_level = 1
+    for compression, extension, open_func in [("gzip", ".gz", gzip.open),
+                                              ("bz2", ".bz2", bz2.open),
+                                              ("lzma", ".xz", lzma.open)]:
+      self.sweep.output_compression = compression
+      file_name, = ConfigGenerator(self.sweep, output_format=FORMAT_JSONL).run()
+      self.assertEqual(os.path.basename(file_name), "mysweep.jsonl" + extension)
+      with open_func(file_name, "rt") as f:
+        output = [json.loads(line) for line in f]
+      # The compression settings are attributes of the sweep too.
+      for config in output:
+        sweep = config['FakeDesignSweep("mysweep")']
+        self.assertEqual(sweep.pop("output_compression"), compression)
+        self.assertEqual(sweep.pop("output_compression_level"), 1)
+      self.assertEqual(output, expected)
+
+  def test_schema_is_not_compressed(self):
+    self.sweep.output_compression = "gzip"
+    schema_file_name, file_name = ConfigGenerator(self.sweep, output_format=FORMAT_CSV).run()
+    self.assertEqual(os.path.basename(schema_file_name), "mysweep.schema.json")
+    self.assertEqual(os.path.basename(file_name), "mysweep.csv.gz")
+
+  def test_unknown_compression(self):
+    self.sweep.output_compression = "zip"
+    self.assertRaises(ValueError, ConfigGenerator, self.sweep)
+
+class PerConfigFiles(GeneratorTestCase):
+  def setUp(self):
+    super(PerConfigFiles, self).setUp()
+    self.sweep.output_dir = tempfile.mkdtemp()
+    self.expected = [c.dictify() for c in ConfigGenerator(self.sweep).iterconfigs()]
+
+  def tearDown(self):
+    shutil.rmtree(self.sweep.output_dir)
+
+  def loadConfig(self, file_name, open_func=open):
+    with open_func(file_name, "rt") as f:
+      config = json.load(f)
+    # The layout settings are attributes of the sweep too.
+    sweep = config['FakeDesignSweep("mysweep")']
+    for attr in ["output_layout", "output_bucket_size", "output_compression"]:
+      sweep.pop(attr, None)
+    return config
+
+  def getRelativePaths(self, genfiles):
+    return [os.path.relpath(f, self.sweep.output_dir) for f in genfiles]
+
+  def test_hive_layout(self):
+    self.sweep.output_layout = LAYOUT_HIVE
+    genfiles = ConfigGenerator(self.sweep).run()
+    self.assertEqual(self.getRelativePaths(genfiles), [
+        os.path.join("mysweep", "int_param=%d" % i, "inner0_param=%d" % j, "config.json")
+        for i in [1, 2, 3] for j in [1, 2, 4, 8]])
+    self.assertEqual([self.loadConfig(f) for f in genfiles], self.expected)
+
+  def test_hive_values_are_escaped(self):
+    self.sweep.output_layout = LAYOUT_HIVE
+    self.sweep.top1.middle1.setSweepParameterList("str_param", ["a/b", "c d"])
+    genfiles = ConfigGenerator(self.sweep).run()
+    self.assertEqual(len(genfiles), 24)
+    self.assertEqual(self.getRelativePaths(genfiles)[:2], [
+        os.path.join("mysweep", "int_param=1", "str_param=a%2Fb", "inner0_param=%d" % j,
+                     "config.json") for j in [1, 2]])
+    self.assertIn(os.path.join("mysweep", "int_param=1", "str_param=c%20d", "inner0_param=1",
+                               "config.json"), self.getRelativePaths(genfiles))
+
+  def test_bucket_layout(self):
+    self.sweep.output_layout = LAYOUT_BUCKETS
+    self.sweep.output_bucket_size = 5
+    genfiles = ConfigGenerator(self.sweep).run()
+    self.assertEqual(self.getRelativePaths(genfiles), [
+        os.path.join("mysweep", str(k // 5), "%d.json" % k) for k in range(12)])
+    self.assertEqual([self.loadConfig(f) for f in genfiles], self.expected)
+
+  def test_shard_with_constraint(self):
+    self.sweep.output_layout = LAYOUT_BUCKETS
+    self.sweep.addConstraint(ParseExpression("top1.inner0_param != 2"))
+    genfiles = ConfigGenerator(self.sweep, shard=(1, 2)).run()
+    self.assertEqual(self.getRelativePaths(genfiles), [
+        os.path.join("mysweep.shard1of2", "0", "%d.json" % k) for k in [6, 7, 8, 10, 11]])
+
+  def test_compressed(self):
+    self.sweep.output_layout = LAYOUT_BUCKETS
+    self.sweep.output_compression = "gzip"
+    genfiles = ConfigGenerator(self.sweep).run()
+    self.assertTrue(all(f.endswith(".json.gz") for f in genfiles))
+    self.assertEqual([self.loadConfig(f, gzip.open) for f in genfiles], self.expected)
+
+  def test_invalid_layouts(self):
+    self.sweep.output_layout = "flat"
+    self.assertRaises(ValueError, ConfigGenerator, self.sweep)
+    self.sweep.output_layout = LAYOUT_HIVE
+    self.assertRaises(ValueError, ConfigGenerator, self.sweep, output_format=FORMAT_CSV)
+
+class ExpressionTestCase(GeneratorTestCase):
+  def setUp(self):
+    super(ExpressionTestCase, self).setUp()
+    self.sweep.top1.middle1.int_param = ParseExpression("top1.int_param * 2")
+    self.generator = ConfigGenerator(self.sweep)
+
+class CompiledSweepPlan(ExpressionTestCase):
+  def test_slots(self):
+    plan = self.generator.plan
+    self.assertEqual(sorted((attr, pos) for _, attr, pos, _ in plan.sweep_slots),
+                     [("inner0_param", 1), ("int_param", 0)])
+    self.assertEqual([attr for _, attr, _ in plan.expression_slots], ["int_param"])
+    # Everything else that was never set takes its default value.
+    self.assertEqual(len(plan.default_slots), 11)
+
+  def test_apply(self):
+    for config_index, config in enumerate(self.generator.iterconfigs()):
+      int_param, inner0_param = self.generator.decodeConfigIndex(config_index)
+      self.assertEqual(config.top1.int_param, int_param + 1)
+      self.assertEqual(config.top1.inner0_param, 2 ** inner0_param)
+      self.assertEqual(config.top1.middle1.int_param, 2 * (int_param + 1))
+      self.assertEqual(config.top1.middle2.int_param, 0)
+      self.assertEqual(config.top1.middle2.str_param, "a")
+
+  def test_expression_on_default_value(self):
+    self.sweep.top1.middle2.int_param = ParseExpression("top1.middle1.inner1_param + 1")
+    generator = ConfigGenerator(self.sweep)
+    for config in generator.iterconfigs():
+      self.assertEqual(config.top1.middle2.int_param, 1)
+
+class TemplateOverlay(ExpressionTestCase):
+  def test_overlay_holds_only_varying_values(self):
+    config = self.generator.generateConfig(5)
+    self.assertIsInstance(config, SweepableView)
+    self.assertIsInstance(config.top1.middle1, ConfigView)
+    self.assertEqual(len(config.values_), 3)
+    self.assertIs(config.template_, self.generator.generateConfig(6).template_)
+
+  def test_read_only(self):
+    config = self.generator.generateConfig(0)
+    self.assertRaises(AttributeError, setattr, config.top1, "int_param", 3)
+
+  def test_iterattr(self):
+    config = self.generator.generateConfig(0)
+    self.assertEqual([str(v) for v in config.top1.iterattrvalues(objtype=SweepableView)],
+                     ['FakeSweepable("middle1")', 'FakeSweepable("middle2")'])
+
+class VectorizedExpressions(GeneratorTestCase):
+  def setExpressions(self, expressions):
+    for obj, text in expressions:
+      obj.int_param = ParseExpression(text)
+    self.generator = ConfigGenerator(self.sweep)
+
+  def checkBatchMatchesScalar(self):
+    plan = self.generator.plan
+    all_indices = list(itertools.product(range(3), range(4)))
+    batch = plan.buildBatch(all_indices)
+    for indices, config in zip(all_indices, batch):
+      self.assertEqual(config.dictify(), plan.build(indices).dictify())
+
+  def test_vectorized(self):
+    self.setExpressions([
+        (self.sweep.top1.middle1, "(top1.int_param * 3 - top1.inner0_param) / 2"),
+        (self.sweep.top1.middle2, "top1.middle1.int_param >= top1.inner0_param"),
+        (self.sweep, "-top1.middle1.inner1_param + 1"),
+    ])
+    digits = np.array(list(itertools.product(range(3), range(4))))
+    results = self.generator.plan.evalExpressionsBatch(digits)
+    self.assertTrue(all(r is not None for r in results))
+    self.assertEqual(results[1], [(i * 3 - 2 ** j) / 2.0 for i in range(1, 4) for j in range(4)])
+    self.assertEqual(results[2], [i * 3 - 2 ** j >= 2 * 2 ** j
+                                  for i in range(1, 4) for j in range(4)])
+    self.assertEqual(results[0], [1.0] * 12)
+    self.checkBatchMatchesScalar()
+
+  def test_fallback(self):
+    self.sweep.top1.middle1.low0 = [1, 2]
+    self.setExpressions([
+        (self.sweep.top1.middle1, "top1.middle1.low0 * top1.int_param"),
+        (self.sweep.top1.middle2, "top1.int_param + 1"),
+    ])
+    digits = np.array([(0, 0), (1, 0)])
+    results = self.generator.plan.evalExpressionsBatch(digits)
+    self.assertEqual(results, [None, [2.0, 3.0]])
+
+  def test_division_by_zero(self):
+    self.setExpressions([(self.sweep.top1.middle1, "1 / (top1.int_param - 2)")])
+    self.assertRaises(ZeroDivisionError, list, self.generator.iterconfigs())
+
+class CompiledExpressions(GeneratorTestCase):
+  def test_matches_eval(self):
+    self.sweep.int_param = 3
+    self.sweep.top1.int_param = 4
+    for text in ["int_param", "-int_param + 2", "int_param * top1.int_param / 8 - 1",
+                 "(int_param - top1.int_param) * (2 + 2.5)", "int_param < top1.int_param",
+                 "1 < int_param < top1.int_param", "int_param == top1.int_param",
+                 "int_param * 2 != 6"]:
+      expression = ParseExpression(text)
+      self.assertEqual(expression.compile()(self.sweep), expression.eval(self.sweep), text)
+
+  def test_constant_folding(self):
+    resolved = []
+    def resolver(selection):
+      resolved.append(selection)
+      return FoldedConstant(3) if selection == ["a"] else operator.itemgetter(0)
+    compiled = ParseExpression("(a * 2 + 1) * b").compile(resolver)
+    self.assertEqual(resolved, [["a"], ["b"]])
+    self.assertEqual(compiled([2]), 14.0)
+    compiled = ParseExpression("a * 2 > 5").compile(resolver)
+    self.assertEqual(compiled(None), True)
+
+  def test_errors_at_evaluation(self):
+    compiled = ParseExpression("1 / 0").compile()
+    self.assertRaises(ZeroDivisionError, compiled, None)
+
+  def test_plan_selections(self):
+    self.sweep.top1.middle1.int_param = ParseExpression("top1.int_param * top1.middle2.int_param")
+    self.sweep.top1.middle2.int_param = 5
+    plan = ConfigGenerator(self.sweep).plan
+    self.assertIsInstance(plan.resolveSelection_(["top1", "int_param"]), operator.itemgetter)
+    self.assertEqual(plan.resolveSelection_(["top1", "middle2", "int_param"]).value, 5)
+    self.assertRaises(XenonSelectionError, plan.resolveSelection_, ["top1", "bad"])
+    self.assertEqual(plan.build((2, 0)).top1.middle1.int_param, 15)
+
+  def test_pickle(self):
+    self.sweep.top1.middle1.int_param = ParseExpression("top1.int_param + 1")
+    generator = pickle.loads(pickle.dumps(ConfigGenerator(self.sweep)))
+    self.assertEqual(generator.generateConfig(11).top1.middle1.int_param, 4)
+
+class IncrementalExpressions(GeneratorTestCase):
+  def countEvaluations(self, plan, slot):
+    evaluations = []
+    expression_fn = plan.expression_fns[slot]
+    def counting_fn(values):
+      evaluations.append(values)
+      return expression_fn(values)
+    plan.expression_fns[slot] = counting_fn
+    return evaluations
+
+  def test_dependencies(self):
+    expressions = [ParseExpression("top1.int_param * 2"),
+                   ParseExpression("top1.middle1.int_param + top1.inner0_param"),
+                   ParseExpression("top1.middle1.inner1_param + 1")]
+    self.sweep.top1.middle1.int_param = expressions[0]
+    self.sweep.top1.middle2.int_param = expressions[1]
+    self.sweep.int_param = expressions[2]
+    plan = ConfigGenerator(self.sweep).plan
+    deps = [plan.expression_deps[[e for _, _, e in plan.expression_slots].index(expression)]
+            for expression in expressions]
+    self.assertEqual(deps, [frozenset([0]), frozenset([0, 1]), frozenset()])
+
+  def test_reuse_between_configs(self):
+    # A list operand cannot be vectorized, so this is evaluated per config.
+    self.sweep.top1.middle1.low0 = [1, 2]
+    self.sweep.top1.middle1.int_param = ParseExpression("top1.middle1.low0 * top1.int_param")
+    generator = ConfigGenerator(self.sweep)
+    evaluations = self.countEvaluations(generator.plan, 0)
+    configs = list(generator.iterconfigs())
+    # Only the first of the four configs for each value of top1.int_param.
+    self.assertEqual(len(evaluations), 3)
+    for config_index, config in enumerate(configs):
+      int_param = generator.decodeConfigIndex(config_index)[0] + 1
+      self.assertEqual(list(config.top1.middle1.int_param), [int_param, 2 * int_param])
+
+  def test_uniform_within_batch(self):
+    self.sweep.top1.middle1.int_param = ParseExpression("top1.int_param * 2")
+    self.sweep.top1.middle2.int_param = ParseExpression("top1.inner0_param + 1")
+    plan = ConfigGenerator(self.sweep).plan
+    digits = np.array([(1, 0), (1, 1), (1, 3)])
+    self.assertEqual(plan.evalExpressionsBatch(digits), [[4.0] * 3, [2.0, 3.0, 9.0]])
+
+class Constraints(GeneratorTestCase):
+  def setConstraints(self, constraints, **generator_options):
+    for text in constraints:
+      self.sweep.addConstraint(ParseExpression(text))
+    self.generator = ConfigGenerator(self.sweep, **generator_options)
+
+  def countChecks(self):
+    checks = []
+    findViolatedConstraint = self.generator.plan.findViolatedConstraint
+    def countingFindViolatedConstraint(indices):
+      checks.append(indices)
+      return findViolatedConstraint(indices)
+    self.generator.plan.findViolatedConstraint = countingFindViolatedConstraint
+    return checks
+
+  def test_filter(self):
+    self.sweep.top1.middle1.int_param = ParseExpression("top1.int_param * 2")
+    self.setConstraints(["top1.inner0_param < top1.int_param * 2",
+                         "top1.middle1.int_param + top1.inner0_param != 5"])
+    configs = list(self.generator.iterconfigs())
+    expected = [(i, j) for i in range(1, 4) for j in [1, 2, 4, 8]
+                if j < i * 2 and i * 2 + j != 5]
+    self.assertEqual([(c.top1.int_param, c.top1.inner0_param) for c in configs], expected)
+
+  def test_alternative_operators(self):
+    self.setConstraints(["top1.int_param <> 2", "top1.inner0_param GE 2",
+                         "top1.inner0_param NE 8"])
+    configs = list(self.generator.iterconfigs())
+    self.assertEqual([(c.top1.int_param, c.top1.inner0_param) for c in configs],
+                     [(i, j) for i in [1, 3] for j in [2, 4]])
+
+  def test_prune(self):
+    self.setConstraints(["top1.int_param != 2"])
+    checks = self.countChecks()
+    configs = list(self.generator.iterconfigs())
+    self.assertEqual([c.top1.int_param for c in configs], [1] * 4 + [3] * 4)
+    # The first config with top1.int_param == 2 rules out the other three.
+    self.assertEqual(len(checks), 9)
+
+  def test_unsatisfiable(self):
+    self.setConstraints(["top1.middle1.inner1_param > 1"])
+    checks = self.countChecks()
+    self.assertEqual(self.dumpToString(self.generator.generate()), "[]")
+    self.assertEqual(len(checks), 1)
+
+  def test_config_indices(self):
+    self.setConstraints(["top1.inner0_param > 1"])
+    self.assertEqual(self.generator.getNumConfigs(), 12)
+    self.assertEqual(self.generator.generateConfig(5).top1.inner0_param, 2)
+    self.assertRaises(xe.XenonExcludedConfigError, self.generator.generateConfig, 4)
+    self.assertRaises(ValueError, self.generator.generateConfig, 4)
+    self.assertRaises(xe.XenonConfigIndexRangeError, self.generator.generateConfig, 12)
+    configs = [c.dictify() for c in self.generator.iterconfigs()]
+    self.assertEqual(len(configs), 9)
+    for shard_mode in [SHARD_BLOCK, SHARD_STRIDE]:
+      generator = ConfigGenerator(self.sweep, shard_mode=shard_mode)
+      shards = [c.dictify() for shard_index in range(5) for c in
+                generator.iterconfigs(generator.getShardIndices(shard_index, 5))]
+      self.assertEqual(sorted(shards, key=str), sorted(configs, key=str))
+
+  def test_parallel(self):
+    self.setConstraints(["top1.int_param == 2"])
+    expected = self.dumpToString(self.generator.generate())
+    generator = ConfigGenerator(self.sweep, jobs=2)
+    self.assertEqual(self.dumpToString(generator.generate()), expected)
+    self.assertEqual(len(json.loads(expected)), 4)
+
+class Estimate(GeneratorTestCase):
+  def test_exact_when_every_config_is_sampled(self):
+    estimate = self.generator.estimate()
+    self.assertEqual(estimate.num_configs, 12)
+    self.assertEqual(estimate.num_valid_configs, 12)
+    self.assertEqual(estimate.num_samples, 12)
+    self.assertEqual(estimate.json_size, len(self.dumpToString(self.generator.generate())))
+
+  def test_sampled(self):
+    estimate = self.generator.estimate(num_samples=5)
+    self.assertEqual(estimate.num_samples, 5)
+    json_size = len(self.dumpToString(self.generator.generate()))
+    self.assertLess(abs(estimate.json_size - json_size), json_size * 0.1)
+    self.assertGreaterEqual(estimate.generation_time, 0)
+
+  def test_constraints(self):
+    self.sweep.addConstraint(ParseExpression("top1.int_param < 3"))
+    generator = ConfigGenerator(self.sweep)
+    estimate = generator.estimate()
+    self.assertEqual(estimate.num_configs, 12)
+    self.assertEqual(estimate.num_valid_configs, 8)
+    self.assertEqual(estimate.json_size, len(self.dumpToString(generator.generate())))
+
+  def test_no_valid_configs(self):
+    self.sweep.addConstraint(ParseExpression("top1.int_param > 3"))
+    estimate = ConfigGenerator(self.sweep).estimate()
+    self.assertEqual(estimate.num_valid_configs, 0)
+    self.assertEqual(estimate.json_size, len("[]"))
+
+class ConfigIndexAddressing(GeneratorTestCase):
+  def test_num_configs(self):
+    self.assertEqual(self.generator.getNumConfigs(), 12)
+    self.assertEqual(self.generator.getNumConfigs(),
+                     len(list(self.generator.iterconfigs())))
+
+  def test_encode_decode(self):
+    all_indices = list(itertools.product(range(3), range(4)))
+    for config_index, indices in enumerate(all_indices):
+      self.assertEqual(self.generator.decodeConfigIndex(config_index), indices)
+      self.assertEqual(self.generator.encodeConfigIndex(indices), config_index)
+    param_ids = self.generator.param_ids
+    self.assertEqual(
+        self.generator.encodeConfigIndex({param_ids[0]: 2, param_ids[1]: 1}), 9)
+
+  def test_generate_config(self):
+    for config_index, config in enumerate(self.generator.iterconfigs()):
+      self.assertEqual(self.generator.generateConfig(config_index).dictify(),
+                       config.dictify())
+
+  def test_out_of_range(self):
+    self.assertRaises(IndexError, self.generator.decodeConfigIndex, 12)
+    self.assertRaises(IndexError, self.generator.decodeConfigIndex, -1)
+    self.assertRaises(IndexError, self.generator.encodeConfigIndex, (3, 0))
+    self.assertRaises(IndexError, self.generator.encodeConfigIndex, (0,))
+
+class Sharding(GeneratorTestCase):
+  def generateShards(self, num_shards, shard_mode):
+    shards = []
+    for shard_index in range(num_shards):
+      generator = ConfigGenerator(
+          self.sweep, shard=(shard_index, num_shards), shard_mode=shard_mode)
+      indices = generator.getShardIndices(shard_index, num_shards)
+      shards.append(json.loads(self.dumpToString(generator.generate(indices))))
+    return shards
+
+  def test_block_shards(self):
+    full = json.loads(self.dumpToString(self.generator.generate()))
+    shards = self.generateShards(5, SHARD_BLOCK)
+    self.assertEqual([len(s) for s in shards], [2, 2, 3, 2, 3])
+    self.assertEqual(full, [config for shard in shards for config in shard])
+
+  def test_stride_shards(self):
+    full = json.loads(self.dumpToString(self.generator.generate()))
+    shards = self.generateShards(5, SHARD_STRIDE)
+    for shard_index, shard in enumerate(shards):
+      self.assertEqual(full[shard_index::5], shard)
+
+  def test_more_shards_than_configs(self):
+    shards = self.generateShards(20, SHARD_BLOCK)
+    self.assertEqual(sum(len(s) for s in shards), 12)
+
+  def test_invalid_shard(self):
+    self.assertRaises(ValueError, self.generator.getShardIndices, 2, 2)
+    self.assertRaises(ValueError, self.generator.getShardIndices, 0, 0)
+    generator = ConfigGenerator(self.sweep, shard_mode="bad")
+    self.assertRaises(ValueError, generator.getShardIndices, 0, 1)
+
+class ParallelGeneration(GeneratorTestCase):
+  def test_matches_sequential(self):
+    expected = self.dumpToString(self.generator.generate())
+    for jobs in [2, 3]:
+      generator = ConfigGenerator(self.sweep, jobs=jobs)
+      config_set = generator.generate()
+      self.assertIsInstance(config_set, ParallelConfigSet)
+      self.assertEqual(self.dumpToString(config_set), expected)
+
+  def test_sharded(self):
+    generator = ConfigGenerator(self.sweep, jobs=2)
+    indices = generator.getShardIndices(1, 2)
+    self.assertEqual(self.dumpToString(generator.generate(indices)),
+                     self.dumpToString(self.generator.generate(indices)))
+
+  def test_chunks(self):
+    config_set = ParallelConfigSet(self.generator, range(12), 2)
+    self.assertEqual(config_set.chunk_size, 1)
+    config_set.chunk_size = 5
+    self.assertEqual(list(config_set.iterchunks()), [range(0, 5), range(5, 10), range(10, 12)])
+
+  def test_empty(self):
+    config_set = ParallelConfigSet(self.generator, range(0), 2)
+    self.assertEqual(self.dumpToString(config_set), "[]")
+
+if __name__ == "__main__":
+  unittest.main()
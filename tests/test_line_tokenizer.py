@@ -0,0 +1,91 @@
+# Unit tests for tokenizing simple commands without pyparsing.
+
+import unittest
+
+from xenon.base.commands import *
+from xenon.base.line_tokenizer import tokenizeLine
+from xenon.base.parser import getCommandClass, getParser, parseLine
+
+class LineTokenizerTestCase(unittest.TestCase):
+  def getCommandAttrs(self, command):
+    """ Return the attributes of a command that were bound from its parse results. """
+    attrs = {}
+    for attr, value in vars(command).items():
+      if attr == "parse_result":
+        continue
+      if isinstance(value, SelectionCommand):
+        value = value.tokens
+      if attr in ("selection", "tokens", "list_value"):
+        value = [token if isinstance(token, str) else list(token) for token in value]
+      attrs[attr] = value
+    return attrs
+
+  def assertTokenizedLike(self, text, expected_line):
+    """ Assert that text is tokenized into the same command as by pyparsing. """
+    command, line, results = tokenizeLine(text)
+    self.assertEqual(line, expected_line)
+    self.assertIsNotNone(results, text)
+    expected_results = getParser(command).parseString(line, parseAll=True)
+    CommandClass = getCommandClass(command)
+    self.assertEqual(self.getCommandAttrs(CommandClass(1, line, results)),
+                     self.getCommandAttrs(CommandClass(1, line, expected_results)))
+
+  def test_simple_commands(self):
+    for text in ["begin ExhaustiveSweep mysweep",
+                 "end mysweep",
+                 "generate configs",
+                 "use xenon.tests.machsuite",
+                 "use xenon.tests.machsuite.*",
+                 'source "settings.xe"',
+                 "set cycle_time 5",
+                 "set cycle_time for * 5",
+                 "set cycle_time for md_knn.* 5",
+                 "set cycle_time for md_knn.force_x 5",
+                 'set output_dir "outputs/sweep"',
+                 "set output_dir for * 'outputs'",
+                 "sweep cycle_time from 1 to 5",
+                 "sweep cycle_time from 1 to 5 3",
+                 "sweep cycle_time for md_knn.* from 1 to 16 expstep 2",
+                 "sweep cycle_time for * from 1 to 16 linstep",
+                 "set for 3",
+                 ]:
+      self.assertTokenizedLike(text, text)
+
+  def test_comments_and_whitespace(self):
+    self.assertTokenizedLike("set  cycle_time\tfor md_knn.*   5  # a comment",
+                             "set cycle_time for md_knn.* 5")
+    self.assertTokenizedLike('set output_dir "two  spaces"', 'set output_dir "two spaces"')
+    self.assertEqual(tokenizeLine("# A comment."), ("", "", None))
+
+  def test_escaped_strings(self):
+    # Only pyparsing converts escapes, so these are left to it, and parseLine()
+    # gives the same command as the grammar.
+    for text in [r'set output_dir "a\tb"', r"set output_dir 'a\nb'",
+                 r'source "dir\file.xe"']:
+      command, line, results = tokenizeLine(text)
+      self.assertIsNone(results, text)
+      expected_results = getParser(command).parseString(line, parseAll=True)
+      self.assertEqual(self.getCommandAttrs(parseLine(1, text)),
+                       self.getCommandAttrs(getCommandClass(command)(1, line, expected_results)))
+    self.assertEqual(parseLine(1, r'set output_dir "a\tb"').value, "a\tb")
+
+  def test_expressions_are_left_to_pyparsing(self):
+    for text in ["set cycle_time md_knn.unrolling * 2",
+                 "set cycle_time for md_knn.* 3 + 4",
+                 "set cycle_time for 3",
+                 "set cycle_time [1, 2, 3]",
+                 'set output_dir ""',
+                 "sweep cycle_time [1, 2, 4]",
+                 "sweep cycle_time from 1 to 5 expstep 2 3",
+                 "require cycle_time < 4",
+                 ]:
+      command, line, results = tokenizeLine(text)
+      self.assertEqual(command, text.split()[0])
+      self.assertIsNone(results, text)
+
+  def test_unclassified_lines(self):
+    for text in ["invalid command", "generate", "set=3", u"set name \"café\""]:
+      self.assertIsNone(tokenizeLine(text), text)
+
+if __name__ == "__main__":
+  unittest.main()
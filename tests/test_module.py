@@ -60,3 +60,5 @@ def createFakeSweepEnviron():
   return sweep
 
 USE_COMMAND_SWEEP_TEST_OBJ = createFakeSweepEnviron()
+# A plain value, which can be imported but is not part of any config.
+USE_COMMAND_PLAIN_VALUE = 5
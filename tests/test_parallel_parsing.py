@@ -0,0 +1,59 @@
+# Unit tests for parsing Xenon files with worker processes.
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import xenon.base.parser as parser
+from xenon.base.parser import XenonParser
+
+class ParallelParsing(unittest.TestCase):
+  def setUp(self):
+    self.source_dir = tempfile.mkdtemp()
+    self.writeFile("settings.xe", 'set output_dir "outputs"\n# A comment.\ngenerate configs\n')
+    self.writeFile("more_settings.xe", "set cycle_time for md_knn.* 2\n")
+    lines = ["begin ExhaustiveSweep mysweep", "use xenon.tests.machsuite.*"]
+    for i in range(20):
+      lines.append("set cycle_time for md_knn.* %d" % i)
+      lines.append("sweep unrolling for md_knn.force_x from 1 to %d expstep 2" % (i + 1))
+      lines.append("")
+      lines.append("set partition_factor for md_knn.* md_knn.force_x.unrolling * %d" % i)
+    lines.insert(10, 'source "settings.xe"')
+    lines.insert(50, 'source "more_settings.xe"')
+    lines.append("end mysweep")
+    self.writeFile("sweep.xe", "\n".join(lines) + "\n")
+
+  def tearDown(self):
+    shutil.rmtree(self.source_dir)
+
+  def writeFile(self, name, contents):
+    with open(os.path.join(self.source_dir, name), "w") as f:
+      f.write(contents)
+
+  def parse(self, jobs):
+    filename = os.path.join(self.source_dir, "sweep.xe")
+    with mock.patch.object(parser, "PARSE_CHUNK_SIZE", 7):
+      commands = XenonParser(jobs=jobs).parse(filename)
+    return [(type(c).__name__, c.lineno, c.line) for c in commands]
+
+  def test_same_commands_as_one_process(self):
+    expected = self.parse(1)
+    self.assertEqual(len(expected), 66)
+    self.assertEqual(expected[7:10], [
+        ("SetCommand", 10, "set partition_factor for md_knn.* md_knn.force_x.unrolling * 1"),
+        ("SetCommand", 1, 'set output_dir "outputs"'),
+        ("GenerateCommand", 3, "generate configs")])
+    self.assertEqual(self.parse(2), expected)
+
+  def test_syntax_error_line_number(self):
+    self.writeFile("more_settings.xe", "set cycle_time for md_knn.* 2\nnot a command\n")
+    for jobs in [1, 2]:
+      with mock.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+        self.assertRaises(SystemExit, self.parse, jobs)
+      self.assertTrue(stderr.getvalue().startswith("Invalid syntax on line 2:\n"))
+
+if __name__ == "__main__":
+  unittest.main()
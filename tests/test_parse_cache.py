@@ -0,0 +1,118 @@
+# Unit tests for the cache of parsed Xenon files.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from xenon.base.parse_cache import ParseCache
+from xenon.base.parser import XenonParser
+
+class CountingParseCache(ParseCache):
+  """ A ParseCache that counts the files that were parsed and stored. """
+  def __init__(self, cache_dir):
+    super(CountingParseCache, self).__init__(cache_dir)
+    self.num_stored = 0
+
+  def store(self, *args):
+    self.num_stored += 1
+    super(CountingParseCache, self).store(*args)
+
+class ParseCacheTestCase(unittest.TestCase):
+  def setUp(self):
+    self.source_dir = tempfile.mkdtemp()
+    self.cache_dir = tempfile.mkdtemp()
+    self.writeFile("settings.xe", 'set output_dir "outputs"\n')
+    self.writeFile("common.xe", 'source "settings.xe"\ngenerate configs\n')
+    self.writeFile("sweep.xe",
+                   "begin ExhaustiveSweep mysweep\n"
+                   "use xenon.tests.machsuite.*\n"
+                   "\n"
+                   "sweep cycle_time from 1 to 5\n"
+                   'source "common.xe"\n'
+                   "end mysweep\n")
+
+  def tearDown(self):
+    shutil.rmtree(self.source_dir)
+    shutil.rmtree(self.cache_dir)
+
+  def writeFile(self, name, contents):
+    with open(os.path.join(self.source_dir, name), "w") as f:
+      f.write(contents)
+
+  def parse(self):
+    """ Parse sweep.xe through the cache.
+
+    Returns:
+      A tuple of the parsed commands as (line number, line) tuples, and the
+      number of files that were actually parsed.
+    """
+    cache = CountingParseCache(self.cache_dir)
+    commands = XenonParser(cache=cache).parse(os.path.join(self.source_dir, "sweep.xe"))
+    return [(c.lineno, c.line) for c in commands], cache.num_stored
+
+  def test_unchanged_files_are_not_parsed(self):
+    expected = [(1, "begin ExhaustiveSweep mysweep"),
+                (2, "use xenon.tests.machsuite.*"),
+                (4, "sweep cycle_time from 1 to 5"),
+                (1, 'set output_dir "outputs"'),
+                (2, "generate configs"),
+                (6, "end mysweep")]
+    self.assertEqual(self.parse(), (expected, 3))
+    self.assertEqual(self.parse(), (expected, 0))
+
+  def test_changed_sourced_file(self):
+    self.parse()
+    self.writeFile("settings.xe", 'set output_dir "elsewhere"\n')
+    commands, num_parsed = self.parse()
+    self.assertIn((1, 'set output_dir "elsewhere"'), commands)
+    # common.xe and sweep.xe are unchanged, but they source settings.xe.
+    self.assertEqual(num_parsed, 3)
+    self.assertEqual(self.parse()[1], 0)
+
+  def test_changed_top_level_file(self):
+    self.parse()
+    self.writeFile("sweep.xe",
+                   "begin ExhaustiveSweep mysweep\n"
+                   'source "common.xe"\n'
+                   "end mysweep\n")
+    commands, num_parsed = self.parse()
+    self.assertEqual(len(commands), 4)
+    # The cached common.xe is still valid.
+    self.assertEqual(num_parsed, 1)
+
+  def test_corrupt_entry(self):
+    expected, _ = self.parse()
+    for entry in os.listdir(self.cache_dir):
+      with open(os.path.join(self.cache_dir, entry), "w") as f:
+        f.write("not a pickle")
+    self.assertEqual(self.parse(), (expected, 3))
+
+  def test_unwritable_cache(self):
+    expected, _ = self.parse()
+    shutil.rmtree(self.cache_dir)
+    # The cache directory cannot be created where a file is.
+    with open(self.cache_dir, "w") as f:
+      f.write("not a directory")
+    try:
+      self.assertEqual(self.parse(), (expected, 3))
+    finally:
+      os.remove(self.cache_dir)
+      os.makedirs(self.cache_dir)
+
+  def test_same_file_in_another_directory(self):
+    self.parse()
+    other_dir = tempfile.mkdtemp()
+    try:
+      for name in ["sweep.xe", "common.xe"]:
+        shutil.copy(os.path.join(self.source_dir, name), other_dir)
+      with open(os.path.join(other_dir, "settings.xe"), "w") as f:
+        f.write('set output_dir "other"\n')
+      parser = XenonParser(cache=ParseCache(self.cache_dir))
+      commands = parser.parse(os.path.join(other_dir, "sweep.xe"))
+      self.assertIn('set output_dir "other"', [c.line for c in commands])
+    finally:
+      shutil.rmtree(other_dir)
+
+if __name__ == "__main__":
+  unittest.main()
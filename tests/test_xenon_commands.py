@@ -6,7 +6,9 @@ import unittest
 import xenon.base.parser
 import xenon.base.globalscope as g
 from xenon.base.commands import *
-from xenon.base.datatypes import Param
+import xenon.base.common as common
+from xenon.base.datatypes import Param, UnassignedParamValue, XenonObj, getParamHolders
+from xenon.generators.exhaustive_configs import ConfigGenerator
 
 from xenon.tests import test_module
 
@@ -44,6 +46,13 @@ class UseCommand(CommandTestCase):
     self.executeCommand("use xenon.tests.test_module.*")
     self.assertIn("USE_COMMAND_SWEEP_TEST_OBJ", self.sweep.__dict__)
 
+  def test_plain_value_is_not_in_configs(self):
+    self.executeCommand("use xenon.tests.test_module.USE_COMMAND_PLAIN_VALUE")
+    self.assertEqual(self.sweep.USE_COMMAND_PLAIN_VALUE, 5)
+    self.assertNotIn("USE_COMMAND_PLAIN_VALUE", self.sweep.user_attrs)
+    config = next(ConfigGenerator(self.sweep).iterconfigs()).dictify()
+    self.assertNotIn("USE_COMMAND_PLAIN_VALUE", config['FakeDesignSweep("mysweep")'])
+
   def test_global_import(self):
     """ Tests importing into global scope before a sweep is declared. """
     self.sweep = None
@@ -51,6 +60,49 @@ class UseCommand(CommandTestCase):
     self.assertIn("FakeDesignSweep", g.scope.__dict__)
     self.assertEqual(test_module.FakeDesignSweep, g.scope.__dict__["FakeDesignSweep"])
 
+  def test_copy_on_write(self):
+    self.executeCommand("use xenon.tests.test_module.*")
+    shared = self.sweep.USE_COMMAND_SWEEP_TEST_OBJ
+    this_sweep, self.sweep = self.sweep, test_module.createFakeSweepEnviron()
+    self.executeCommand("use xenon.tests.test_module.*")
+    other_sweep, self.sweep = self.sweep, this_sweep
+    self.assertIs(other_sweep.USE_COMMAND_SWEEP_TEST_OBJ, shared)
+    self.assertIsNot(shared, test_module.USE_COMMAND_SWEEP_TEST_OBJ)
+
+    self.executeCommand("set inner0_param for USE_COMMAND_SWEEP_TEST_OBJ.top1.middle1 5")
+    self.executeCommand("sweep inner1_param for USE_COMMAND_SWEEP_TEST_OBJ.* from 1 to 3")
+    copied = self.sweep.USE_COMMAND_SWEEP_TEST_OBJ
+    self.assertIsNot(copied, shared)
+    self.assertEqual(copied.top1.middle1.inner0_param, 5)
+    self.assertEqual(copied.top1.middle2.getSweepParamRange("inner1_param"), [1, 2, 3])
+    # The other sweep and the module are unchanged.
+    self.assertIs(other_sweep.USE_COMMAND_SWEEP_TEST_OBJ, shared)
+    for obj in [shared, test_module.USE_COMMAND_SWEEP_TEST_OBJ]:
+      self.assertIsInstance(obj.top1.middle1.inner0_param, UnassignedParamValue)
+      self.assertFalse(obj.top1.middle2.hasSweepParamRange("inner1_param"))
+
+  def test_unmodified_imports_are_shared(self):
+    self.executeCommand("use xenon.tests.machsuite.*")
+    aes_aes, bfs_bulk = self.sweep.aes_aes, self.sweep.bfs_bulk
+    # None of the imported objects have an output_dir.
+    self.executeCommand('set output_dir "tmp"')
+    self.assertEqual(self.sweep.output_dir, "tmp")
+    self.assertIs(self.sweep.aes_aes, aes_aes)
+    self.assertIs(self.sweep.bfs_bulk, bfs_bulk)
+    self.executeCommand("set cycle_time for aes_aes.* 5")
+    self.assertIsNot(self.sweep.aes_aes, aes_aes)
+    self.assertEqual(self.sweep.aes_aes.cycle_time, 5)
+    self.assertIs(self.sweep.bfs_bulk, bfs_bulk)
+
+  def test_frozen_objects(self):
+    self.executeCommand("use xenon.tests.test_module.*")
+    shared = self.sweep.USE_COMMAND_SWEEP_TEST_OBJ.top1
+    with self.assertRaises(XenonFrozenObjectError):
+      shared.int_param = 3
+    with self.assertRaises(XenonFrozenObjectError):
+      shared.setSweepParameter("int_param", 1, 3, 1, KW_LINSTEP)
+    self.assertIsInstance(shared.int_param, UnassignedParamValue)
+
 class SelectionCommand(CommandTestCase):
   def setUp(self):
     super(SelectionCommand, self).setUp()
@@ -68,6 +120,182 @@ class SelectionCommand(CommandTestCase):
     self.assertIn(self.sweep.top1.middle1, selected_objs)
     self.assertIn(self.sweep.top1.middle2, selected_objs)
 
+class PathIndexSelections(CommandTestCase):
+  def walk(self, selection):
+    """ Select objects by walking the object tree instead of using the index. """
+    tokens = selection.split(".")
+    view = self.sweep
+    for token in tokens:
+      if token == LIT_STAR:
+        return [obj for obj in common.recursiveSelect(view, objtype=XenonObj) + [view]
+                if not isinstance(obj, UnassignedParamValue)]
+      view = getattr(view, token)
+    return [view]
+
+  def select(self, selection):
+    return self.executeCommand("for %s" % selection, command_type=KW_FOR)
+
+  def assertSameSelections(
+      self, selections=["*", "top1", "top1.*", "top1.middle1", "top1.middle2.*"]):
+    for selection in selections:
+      self.assertEqual(self.select(selection), self.walk(selection), selection)
+
+  def test_same_as_tree_walk(self):
+    self.assertSameSelections()
+
+  def test_attribute_changes(self):
+    self.assertSameSelections()
+    self.sweep.top1.middle3 = test_module.FakeSweepable("middle3")
+    self.assertIn(self.sweep.top1.middle3, self.select("top1.*"))
+    self.assertSameSelections()
+    del self.sweep.top1.middle1
+    self.assertNotIn("middle1", [obj.name for obj in self.select("*")])
+    self.assertSameSelections(["*", "top1.*"])
+
+  def test_use_command(self):
+    self.select("*")
+    self.executeCommand("use xenon.tests.test_module.*")
+    self.assertIn(self.sweep.USE_COMMAND_SWEEP_TEST_OBJ.top1, self.select("*"))
+    self.assertSameSelections()
+
+  def test_unindexed_paths(self):
+    # Paths to attributes that are not XenonObjs fall back to getattr.
+    self.assertEqual(self.select("top1.middle0"), ["a middle value"])
+    self.assertRaises(XenonSelectionError, self.select, "top1.missing")
+
+class ParamHolderIndex(CommandTestCase):
+  def test_holders(self):
+    holders = getParamHolders("inner0_param")
+    for obj in [self.sweep.top1, self.sweep.top1.middle1, self.sweep.top1.middle2]:
+      self.assertIn(obj, holders)
+    self.assertNotIn(self.sweep, holders)
+    self.assertIn(self.sweep, getParamHolders(test_module.int_param.id))
+
+  def test_same_as_filtered_selection(self):
+    for selection in [[], [["*"]], [["top1"]], [["top1", "*"]], [["top1", "middle1"]]]:
+      for param in ["int_param", "inner0_param", "inner1_param"]:
+        expected = [obj for obj in common.getSelectedObjs(list(selection), self.sweep)
+                    if obj in getParamHolders(param)]
+        self.assertEqual(
+            common.getSelectedParamHolders(list(selection), self.sweep, param), expected)
+        expected = [obj for obj in common.getSelectedObjs(list(selection), self.sweep)
+                    if hasattr(obj, param)]
+        self.assertEqual(
+            common.getSelectedObjsWithAttr(list(selection), self.sweep, param), expected)
+
+  def test_remove_sweepable_param(self):
+    self.sweep.top1.middle1.removeSweepableParam(test_module.inner0_param)
+    self.assertNotIn(self.sweep.top1.middle1, getParamHolders("inner0_param"))
+    self.executeCommand("sweep inner0_param for * from 1 to 4")
+    self.assertFalse(self.sweep.top1.middle1.hasSweepParamRange("inner0_param"))
+    self.assertTrue(self.sweep.top1.middle2.hasSweepParamRange("inner0_param"))
+
+  def test_copies_are_holders(self):
+    self.executeCommand("use xenon.tests.test_module.*")
+    copied = self.sweep.USE_COMMAND_SWEEP_TEST_OBJ.top1
+    self.assertIsNot(copied, test_module.USE_COMMAND_SWEEP_TEST_OBJ.top1)
+    self.assertIn(copied, getParamHolders("inner0_param"))
+    self.executeCommand("set inner0_param for USE_COMMAND_SWEEP_TEST_OBJ.* 5")
+    copied = self.sweep.USE_COMMAND_SWEEP_TEST_OBJ.top1
+    self.assertIn(copied, getParamHolders("inner0_param"))
+    self.assertEqual(copied.inner0_param, 5)
+    self.assertIsInstance(self.sweep.top1.inner0_param, UnassignedParamValue)
+
+class AttributeRegistry(CommandTestCase):
+  def getAllObjs(self):
+    return common.getSelectedObjs([["*"]], self.sweep) + [self.sweep]
+
+  def assertSameAsDir(self):
+    """ Assert that iterating over XenonObj attributes matches a dir() walk. """
+    for obj in self.getAllObjs():
+      for objtype in [XenonObj, type(self.sweep.top1)]:
+        expected = [attr for attr in dir(obj) if obj.filter_func_(attr, objtype)]
+        self.assertEqual(list(obj.iterattrkeys(objtype=objtype)), expected)
+
+  def test_registry(self):
+    self.assertSameAsDir()
+
+  def test_only_attributes_of_the_model(self):
+    self.assertEqual(list(self.sweep.top1.iterattrkeys(objtype=XenonObj)),
+                     ["inner0_param", "inner1_param", "int_param", "middle1",
+                      "middle2", "str_param"])
+    selected = common.recursiveSelect(self.sweep.top1.middle1, objtype=XenonObj)
+    self.assertEqual(len(selected), 4)
+    self.assertTrue(all(isinstance(obj, UnassignedParamValue) for obj in selected))
+    self.assertEqual(self.executeCommand("for top1.middle1.*", command_type=KW_FOR),
+                     [self.sweep.top1.middle1])
+
+  def test_set_and_delete(self):
+    self.sweep.top1.extra = XenonObj()
+    self.assertIn("extra", list(self.sweep.top1.iterattrkeys(objtype=XenonObj)))
+    self.sweep.top1.middle1 = 3
+    self.assertSameAsDir()
+    del self.sweep.top1.extra
+    self.assertNotIn("extra", list(self.sweep.top1.iterattrkeys(objtype=XenonObj)))
+    self.assertSameAsDir()
+
+  def test_use(self):
+    self.executeCommand("use xenon.tests.test_module.*")
+    self.assertIn("USE_COMMAND_SWEEP_TEST_OBJ",
+                  list(self.sweep.iterattrkeys(objtype=XenonObj)))
+    self.assertSameAsDir()
+
+class CompactSweepables(CommandTestCase):
+  def test_shared_state(self):
+    middle1, middle2 = self.sweep.top1.middle1, self.sweep.top1.middle2
+    self.assertIs(middle1.param_table_, middle2.param_table_)
+    self.assertIs(middle1.inner0_param, middle2.inner0_param)
+    self.assertIs(middle1.user_attrs, middle2.user_attrs)
+    self.assertIs(middle1.sweep_params_range_, middle2.sweep_params_range_)
+
+  def test_per_object_changes(self):
+    middle1, middle2 = self.sweep.top1.middle1, self.sweep.top1.middle2
+    self.executeCommand("sweep inner0_param for top1.middle1 from 1 to 4")
+    self.executeCommand("set inner1_param for top1.middle2 3")
+    self.assertEqual(middle1.getSweepParamRange("inner0_param"), [1, 2, 3, 4])
+    self.assertFalse(middle2.hasSweepParamRange("inner0_param"))
+    self.assertIn("inner1_param", middle2.user_attrs)
+    self.assertIsInstance(middle1.inner1_param, UnassignedParamValue)
+
+    middle1.removeSweepableParam(test_module.inner1_param)
+    self.assertIsNone(middle1.getParamId("inner1_param"))
+    self.assertEqual(middle2.getParamId("inner1_param"), test_module.inner1_param.id)
+    self.assertIn(test_module.inner1_param, middle2.sweepable_params_)
+    self.assertNotIn(middle1, getParamHolders(test_module.inner1_param.id))
+    self.assertIn(middle2, getParamHolders(test_module.inner1_param.id))
+
+  def test_add_and_remove(self):
+    middle1, middle2 = self.sweep.top1.middle1, self.sweep.top1.middle2
+    # These are shared, so they cannot be modified in place.
+    self.assertFalse(hasattr(middle1.sweepable_params_, "append"))
+    self.assertFalse(hasattr(middle1.user_attrs, "add"))
+    middle1.removeSweepableParam(test_module.inner1_param)
+    middle1.addSweepableParam(test_module.inner1_param)
+    self.assertEqual(middle1.sweepable_params_[-1], test_module.inner1_param)
+    self.assertIn(middle1, getParamHolders("inner1_param"))
+    extra_param = Param(int, "extra_param", 0)
+    middle1.addSweepableParam(extra_param)
+    self.assertIsInstance(middle1.extra_param, UnassignedParamValue)
+    self.assertEqual(middle1.getParamId("extra_param"), extra_param.id)
+    self.assertIsNone(middle2.getParamId("extra_param"))
+    self.executeCommand("sweep extra_param for * from 1 to 2")
+    self.assertEqual(middle1.getSweepParamRange("extra_param"), [1, 2])
+
+    user_attrs = middle2.user_attrs
+    middle2.addUserAttr("low2")
+    self.assertIn("low2", middle2.user_attrs)
+    self.assertNotIn("low2", self.sweep.top1.user_attrs)
+    middle2.removeUserAttr("low2")
+    self.assertIs(middle2.user_attrs, user_attrs)
+
+  def test_copies_share_state(self):
+    self.executeCommand("use xenon.tests.test_module.*")
+    original = test_module.USE_COMMAND_SWEEP_TEST_OBJ.top1
+    copied = self.sweep.USE_COMMAND_SWEEP_TEST_OBJ.top1
+    self.assertIs(copied.param_table_, original.param_table_)
+    self.assertIs(copied.user_attrs, original.user_attrs)
+    self.assertIn(copied, getParamHolders(test_module.inner0_param.id))
+
 class SetCommand(CommandTestCase):
   def setUp(self):
     super(SetCommand, self).setUp()
@@ -126,6 +354,22 @@ class SetCommand(CommandTestCase):
     self.assertEqual(self.sweep.top1.middle2.str_param, "mystring")
     self.assertEqual(self.sweep.top1.str_param, "mystring")
 
+  def test_plain_attribute_named_like_a_param(self):
+    # Objects with a plain attribute are set too, even if the name is a
+    # sweepable param of other objects.
+    self.sweep.top1.extra = XenonObj()
+    self.executeCommand("set inner0_param for top1.* 3")
+    self.sweep.top1.extra.inner0_param = 7
+    self.sweep.top1.middle1.removeSweepableParam(test_module.inner0_param)
+    self.executeCommand("set inner0_param for top1.* 42")
+    self.assertEqual(self.sweep.top1.extra.inner0_param, 42)
+    self.assertEqual(self.sweep.top1.middle1.inner0_param, 42)
+    self.assertEqual(self.sweep.top1.middle2.inner0_param, 42)
+    del self.sweep.top1.extra.inner0_param
+    self.executeCommand("set inner0_param for top1.* 5")
+    self.assertFalse(hasattr(self.sweep.top1.extra, "inner0_param"))
+    self.assertEqual(self.sweep.top1.middle2.inner0_param, 5)
+
 class Expressions(CommandTestCase):
   def test_simple_expressions(self):
     self.executeCommand("set int_param 3")
@@ -231,6 +475,25 @@ class Expressions(CommandTestCase):
     self.executeCommand("set int_param for top1.middle1 top1.int_param - 10")
     self.assertTrue(np.array_equal(self.sweep.top1.middle1.int_param, [-8,-7,-6]))
 
+class RequireCommand(CommandTestCase):
+  def test_add_constraints(self):
+    self.executeCommand("require top1.int_param < 4")
+    self.executeCommand("require int_param * 2 != top1.middle1.int_param")
+    self.assertEqual(len(self.sweep.constraints_), 2)
+    self.sweep.top1.int_param = 3
+    self.assertTrue(self.sweep.constraints_[0].eval(self.sweep))
+    self.sweep.top1.int_param = 4
+    self.assertFalse(self.sweep.constraints_[0].eval(self.sweep))
+
+  def test_alternative_operators(self):
+    self.executeCommand("require top1.int_param <> 4")
+    self.executeCommand("require top1.int_param LT 5")
+    self.sweep.top1.int_param = 3
+    self.assertTrue(all(c.eval(self.sweep) for c in self.sweep.constraints_))
+    self.sweep.top1.int_param = 4
+    self.assertFalse(self.sweep.constraints_[0].eval(self.sweep))
+    self.assertTrue(self.sweep.constraints_[1].eval(self.sweep))
+
 class SweepCommand(CommandTestCase):
   def setUp(self):
     super(SweepCommand, self).setUp()
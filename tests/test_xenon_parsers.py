@@ -7,6 +7,7 @@ import pyparsing as pp
 import unittest
 
 from xenon.base.commands import *
+import xenon.base.expressions as expressions
 from xenon.base.designsweeptypes import ExhaustiveSweep
 from xenon.base.parser_builders import *
 
@@ -80,12 +81,22 @@ class CommandParser(Common.ParserTestCase):
                       ("condor this and that", False),
                      ]
 
-  @unittest.skip("Require commands not yet supported.")
   def test_require_commands(self):
     self.testcases = [("require something something something", True),
                       ("require (expression)", True),
                       ]
-    self.test_all(self)
+    self.test_all()
+
+class RequireParser(Common.ParserTestCase):
+  def setUp(self):
+    self.parser = buildRequireParser()
+    self.testcases = [("require param < 4", True),
+                      ("require benchmark.param * 2 <= other.param", True),
+                      ("require (param + 1) / 2 != 3", True),
+                      ("require param", True),
+                      ("require", False),
+                      ("set param 3", False),
+                      ]
 
 class SetParser(Common.ParserTestCase):
   def setUp(self):
@@ -215,5 +226,35 @@ class CommentParser(Common.ParserTestCase):
     self.assertEqual(len(results.rest), 0)
     self.assertEqual(str(results.comment), "# This is a comment only.")
 
+class ExpressionGrammar(unittest.TestCase):
+  """ Checks that expressions are parsed into the same trees as by infixNotation. """
+  def buildInfixNotationGrammar(self):
+    arith_expr = pp.infixNotation(expressions.operand,
+        [(expressions.signop, 1, pp.opAssoc.RIGHT, expressions.EvalSignOp),
+         (expressions.multop, 2, pp.opAssoc.LEFT, expressions.EvalMultOp),
+         (expressions.plusop, 2, pp.opAssoc.LEFT, expressions.EvalAddOp)])
+    return pp.infixNotation(arith_expr,
+        [(expressions.comparisonop, 2, pp.opAssoc.LEFT, expressions.EvalComparisonOp)])
+
+  def getTree(self, expr):
+    if isinstance(expr, expressions.EvalConstant):
+      return expr.value if isinstance(expr.value, str) else list(expr.value)
+    if isinstance(expr, expressions.EvalSignOp):
+      return (expr.sign, self.getTree(expr.value))
+    return (type(expr).__name__,
+            [token if isinstance(token, str) else self.getTree(token) for token in expr.value])
+
+  def test_same_trees(self):
+    infix_notation_expr = self.buildInfixNotationGrammar()
+    for text in ["a", "3.5", "a.b.c", "- - a", "a - b - c", "a + b * c / d",
+                 "(a + b) * c", "a * (b + c) - -d", "a <= b < c", "(a < b) == c",
+                 "((a))", "-(a + b)", "a - -3.25 * (b.c - (d + e) / f) >= g <> h"]:
+      expected = infix_notation_expr.parseString(text, parseAll=True)[0]
+      self.assertEqual(self.getTree(expressions.ParseExpression(text)), self.getTree(expected))
+
+  def test_invalid_expressions(self):
+    for text in ["a +", "(a", "a b", "a <", "* a", "a..b"]:
+      self.assertRaises(pp.ParseException, expressions.ParseExpression, text)
+
 if __name__ == "__main__":
   unittest.main()
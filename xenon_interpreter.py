@@ -13,8 +13,10 @@ sys.path.append(os.pardir)
 
 import xenon.base.exceptions as xe
 from xenon.base.commands import *
+from xenon.base.parse_cache import DEFAULT_CACHE_DIR, ParseCache
 from xenon.base.parser import XenonParser
 from xenon.base.datatypes import *
+from xenon.generators.exhaustive_configs import ConfigGenerator, SHARD_BLOCK, SHARD_STRIDE
 
 DEBUG = False
 
@@ -26,8 +28,10 @@ class XenonInterpreter():
   This result can be accessible through the XenonInterpreter.configured_sweep
   attribute.
   """
-  def __init__(self, filename, test_mode=False):
+  def __init__(self, filename, test_mode=False, parse_cache_dir=None):
     self.filename = filename
+    # If not None, parsed files are cached in this directory.
+    self.parse_cache_dir = parse_cache_dir
     # List of (line_number, ParseResult) tuples.
     self.commands_ = []
     # All the sweeps that have been configured, but not yet expanded.
@@ -53,8 +57,9 @@ class XenonInterpreter():
     sys.stderr.write(msg)
     sys.exit(1)
 
-  def parse(self):
-    parser = XenonParser()
+  def parse(self, jobs=1):
+    cache = ParseCache(self.parse_cache_dir) if self.parse_cache_dir else None
+    parser = XenonParser(cache=cache, jobs=jobs)
     self.commands_ = parser.parse(self.filename)
 
   def execute(self):
@@ -74,29 +79,128 @@ class XenonInterpreter():
           self.configured_sweeps[current_sweep.name] = current_sweep
         current_sweep = None
 
-  def generate_outputs(self):
+  def generate_outputs(self, **generator_options):
+    """ Run every generate command of every configured sweep.
+
+    Any generator_options are passed to the generators of each sweep.
+    """
     all_generated_files = []
     for sweep in self.configured_sweeps.values():
+      sweep.setGeneratorOptions(**generator_options)
       generated_files = sweep.generateAllOutputs()
       all_generated_files.extend(generated_files)
     return all_generated_files
 
-  def run(self):
-    self.parse()
+  def generate_config(self, config_index):
+    """ Generate only the config at config_index of every configured sweep.
+
+    Exits with an error if a sweep has no config at config_index, or if that
+    config does not satisfy the constraints of the sweep.
+    """
+    all_generated_files = []
+    for sweep in self.configured_sweeps.values():
+      generator = ConfigGenerator(sweep)
+      try:
+        generated_files = generator.runConfig(config_index)
+      except xe.XenonConfigIndexError as e:
+        self.handleGeneratorError(sweep.name, e)
+      all_generated_files.extend(generated_files)
+    return all_generated_files
+
+  def estimate_outputs(self, stream=sys.stdout):
+    """ Report the projected size of every configured sweep to stream.
+
+    Nothing is written to disk.
+
+    Returns:
+      A dict from sweep name to its SweepEstimate.
+    """
+    estimates = {}
+    for name in sorted(self.configured_sweeps):
+      estimate = ConfigGenerator(self.configured_sweeps[name]).estimate()
+      stream.write("Sweep %s:\n" % name)
+      stream.write("  Configs: %d\n" % estimate.num_configs)
+      stream.write("  Configs satisfying constraints: %d\n" % estimate.num_valid_configs)
+      stream.write("  Projected JSON size: %s\n" % formatSize(estimate.json_size))
+      stream.write("  Projected generation time: %.1f s (from %d sampled configs)\n" %
+                   (estimate.generation_time, estimate.num_samples))
+      estimates[name] = estimate
+    return estimates
+
+  def run(self, config_index=None, shard=None, shard_mode=SHARD_BLOCK, jobs=1,
+          estimate=False):
+    """ Parse, execute, and generate all outputs of the Xenon file.
+
+    Args:
+      config_index: If not None, only generate the config with this index of
+        each sweep instead of the outputs requested by generate commands.
+      shard: If not None, a (shard_index, num_shards) tuple. Only that shard
+        of each sweep is generated.
+      shard_mode: How configs are assigned to shards (SHARD_BLOCK or
+        SHARD_STRIDE).
+      jobs: The number of processes used to parse the Xenon file and to
+        generate configs.
+      estimate: If True, only report the projected size of each sweep and do
+        not generate anything.
+    """
+    self.parse(jobs=jobs)
     self.execute()
-    genfiles = self.generate_outputs()
+    if estimate:
+      self.estimate_outputs()
+      genfiles = []
+    elif config_index is not None:
+      genfiles = self.generate_config(config_index)
+    else:
+      genfiles = self.generate_outputs(shard=shard, shard_mode=shard_mode, jobs=jobs)
     return genfiles
 
+def formatSize(num_bytes):
+  """ Format a number of bytes with a binary unit, like 1.5 GB. """
+  size = float(num_bytes)
+  for unit in ["B", "KB", "MB", "GB", "TB"]:
+    if size < 1024 or unit == "TB":
+      break
+    size /= 1024
+  return "%.1f %s" % (size, unit)
+
+def parseShard(shard_str):
+  """ Parse a shard specification of the form i/N into (i, N). """
+  try:
+    shard_index, num_shards = [int(v) for v in shard_str.split("/")]
+  except ValueError:
+    raise argparse.ArgumentTypeError("Expected a shard of the form i/N, got %s." % shard_str)
+  if num_shards < 1 or shard_index < 0 or shard_index >= num_shards:
+    raise argparse.ArgumentTypeError("Shard index must be between 0 and N-1, got %s." % shard_str)
+  return (shard_index, num_shards)
+
 def main():
   parser = argparse.ArgumentParser()
   parser.add_argument("xenon_file", help="Xenon input file.")
   parser.add_argument("-d", "--debug", action="store_true", help="Turn on debugging output.")
+  parser.add_argument("--config-index", type=int,
+                      help="Only generate the config with this index of each sweep.")
+  parser.add_argument("--shard", type=parseShard, metavar="i/N",
+                      help="Only generate shard i (zero-indexed) of N of each sweep.")
+  parser.add_argument("--shard-mode", choices=[SHARD_BLOCK, SHARD_STRIDE], default=SHARD_BLOCK,
+                      help="Assign contiguous blocks of configs (block) or every Nth "
+                      "config (stride) to each shard.")
+  parser.add_argument("-j", "--jobs", type=int, default=1,
+                      help="Number of processes used to parse and to generate configs.")
+  parser.add_argument("--estimate", action="store_true",
+                      help="Only report the number of configs and the projected output "
+                      "size and generation time of each sweep.")
+  parser.add_argument("--parse-cache-dir", default=DEFAULT_CACHE_DIR,
+                      help="Directory where parsed Xenon files are cached (default: %(default)s).")
+  parser.add_argument("--no-parse-cache", action="store_true",
+                      help="Always parse Xenon files, without reading or updating the cache.")
   args = parser.parse_args()
 
   global DEBUG
   DEBUG = args.debug
-  interpreter = XenonInterpreter(args.xenon_file)
-  interpreter.run()
+  parse_cache_dir = None if args.no_parse_cache else args.parse_cache_dir
+  interpreter = XenonInterpreter(args.xenon_file, parse_cache_dir=parse_cache_dir)
+  interpreter.run(config_index=args.config_index, shard=args.shard,
+                  shard_mode=args.shard_mode, jobs=args.jobs, estimate=args.estimate)
 
 if __name__ == "__main__":
   main()